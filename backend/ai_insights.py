@@ -2,9 +2,390 @@
 AI Insights Generator using Google Gemini API
 """
 
+# gunicorn's gevent workers patch the standard library, but not the sockets in
+# gRPC's C core. Hook gRPC into the gevent loop before the Gemini client loads,
+# or every gRPC call would block the whole worker.
+try:
+    from gevent import monkey
+except ImportError:
+    _UNDER_GEVENT = False
+else:
+    _UNDER_GEVENT = monkey.is_module_patched('socket')
+if _UNDER_GEVENT:
+    import grpc.experimental.gevent
+    grpc.experimental.gevent.init_gevent()
+
 import google.generativeai as genai
+from google.api_core.exceptions import ResourceExhausted
 from config import AI_CONFIG
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import diskcache
+import functools
+import hashlib
 import json
+import numpy as np
+import os
+import random
+import threading
+import time
+
+try:
+    from redis import Redis
+    from redis.exceptions import RedisError
+except ImportError:
+    Redis = None
+
+# Invariant instructions shared by every prompt. Keeping this block byte-identical
+# and at the very start of each request lets Gemini serve it from its implicit
+# prefix cache; only the DATA section after it changes between requests. Implicit
+# caching needs a shared prefix of at least _IMPLICIT_CACHE_MIN_TOKENS, so the
+# preamble is kept comfortably above it (warm_up() logs its measured size).
+_IMPLICIT_CACHE_MIN_TOKENS = 1024
+_SYSTEM_PREAMBLE = """You are an expert AdTech performance analyst writing insights for an automated campaign report read by account managers and their clients.
+
+GROUND RULES:
+1. Base every statement only on the metrics provided in the DATA section. Never invent numbers, dates, audiences, creatives or external causes (weather, holidays, competitor activity).
+2. If a metric needed for a judgement is missing or shown as N/A, say that it is unknown instead of guessing.
+3. Quote numbers exactly as given, with the same units ($, %, counts) and rounding.
+4. Write in plain, professional business English. No markdown, no headings, no bullet symbols, no emojis, no preamble such as "Here is the analysis".
+5. Every recommendation must be concrete and actionable: name the platform, channel or campaign it applies to and the lever to pull (budget, bidding, targeting, creative, landing page).
+6. Respect the sentence limits requested by each task.
+
+METRIC DEFINITIONS:
+- CTR (Click-Through Rate) = clicks / impressions x 100. Higher is better.
+- CPM (Cost Per Mille) = spend / impressions x 1000. Lower is better for the same audience quality.
+- CPC (Cost Per Click) = spend / clicks. Lower is better.
+- Budget utilization = total spend / campaign budget. Below 80% suggests under-delivery; above 100% suggests overspend.
+
+INDUSTRY BENCHMARKS (use these when comparing performance):
+- Google Ads: search CTR 3-6%, display CTR 0.4-1%, CPC $1-$3, CPM $2-$6.
+- Facebook Ads: CTR 0.9-1.6%, CPC $0.50-$2, CPM $6-$12.
+- DV360 (programmatic display and video): CTR 0.3-1%, CPC $1-$4, CPM $2-$10.
+- Across platforms, a typical blended CTR is 1.5-3%.
+- By channel: Search 3-6% CTR, Social 0.9-1.6%, Display 0.4-1%, Video 0.5-1.5%, Mobile 0.6-1.5%.
+
+SCORING RUBRIC:
+- Strong: CTR above the benchmark range for its platform or channel, or CPC below the benchmark range while CTR is within range.
+- Average: CTR and CPC both within the benchmark range.
+- Needs improvement: CTR below the benchmark range, or CPC above the benchmark range.
+- Weight spend when judging importance: a weak result on a high-spend platform, channel or campaign matters more than one on a low-spend one.
+
+RESPONSE STYLE:
+- Lead with the overall verdict, support it with one or two of the provided numbers, then give the recommendation.
+- Prefer relative comparisons ("twice the CTR of Display") over restating every metric.
+- When recommending budget shifts, move budget from the weakest to the strongest performer named in the DATA section.
+
+TASK TYPES AND EXPECTED ANSWERS:
+- Executive summary: 3-4 sentences covering overall delivery and efficiency, the best performing platform and why, and one or two recommendations for the whole account.
+- Platform analysis: 2-3 sentences rating the platform against its own benchmarks using the rubric, and one specific optimization for that platform.
+- Campaign analysis: 2-3 sentences covering budget utilization and efficiency, what is working well (usually the best channel), and exactly one recommendation.
+- Strategic recommendations: exactly three numbered lines ("1.", "2.", "3."), one sentence each, covering overall performance, budget allocation and ROI in that order.
+
+WORKED EXAMPLES (for style only; never reuse their numbers):
+DATA: Campaign 1001, 14 days, spend $4,860.00 of a $6,000.00 budget, CTR 3.20%, CPC $1.23, CPM $5.67, best channel Search (4.10% CTR), worst channel Display (0.80% CTR).
+ANSWER: Campaign 1001 is performing strongly, with a 3.20% CTR above the blended 1.5-3% benchmark and an efficient $1.23 CPC while using 81% of its budget. Search is carrying results at 4.10% CTR, while Display trails at 0.80%. Shift part of the remaining Display budget into Search to lift clicks without increasing spend.
+
+DATA: Platform Facebook Ads, 42 campaigns, spend $18,250.00, 2,950,000 impressions, 26,550 clicks, CTR 0.90%, CPM $6.19, CPC $0.69.
+ANSWER: Facebook Ads is delivering average results, with a 0.90% CTR at the bottom of its 0.9-1.6% benchmark and a competitive $0.69 CPC. Low CPM and CPC show the platform buys reach efficiently, but engagement per impression is soft. Refresh the creatives on the highest-spend campaigns and test tighter interest targeting to move CTR toward 1.5%.
+
+DATA: Executive summary, 120 campaigns, spend $96,400.00, 18,200,000 impressions, 291,200 clicks, overall CTR 1.60%, platforms: Google Ads 2.40% CTR $41,000 spend, Facebook Ads 1.10% CTR $33,500 spend, DV360 0.70% CTR $21,900 spend.
+ANSWER: The account delivered 291,200 clicks from 18,200,000 impressions on $96,400.00 of spend, a 1.60% CTR at the low end of the blended benchmark. Google Ads leads with a 2.40% CTR on the largest share of spend, more than three times the 0.70% CTR of DV360. Move part of the DV360 budget into Google Ads search campaigns, and restrict the remaining DV360 spend to the placements that already exceed 1% CTR.
+
+DATA: Recommendations, 120 campaigns, spend $96,400.00, overall CTR 1.60%, top channel Search (4.20% CTR).
+ANSWER:
+1. Overall performance is average at a 1.60% CTR, so prioritise fixing the weakest campaigns before scaling spend.
+2. Reallocate budget from Display toward Search, which leads the account at a 4.20% CTR.
+3. Pause campaigns whose CPC stays above their platform benchmark for two weeks and reinvest the savings in the top-CTR campaigns to lift ROI.
+
+INTERPRETING THE DATA:
+- Totals are sums over the whole reporting period; averages (CTR, CPM, CPC) are means of the daily values and can differ slightly from totals divided by totals. Do not point out that difference.
+- A campaign, platform or channel with fewer than 1,000 impressions has too little volume for a reliable CTR; call the result early or inconclusive instead of strong or weak.
+- A CTR of 0.00% together with zero clicks usually means tracking is missing or the line item has just started; mention it as a data gap rather than as poor performance.
+- A very high CTR (above 10%) on low impressions is noise, not a winning tactic; do not recommend scaling it.
+- Days running counts the distinct dates with delivery, not calendar days between start and end.
+- Budget of $0.00 means no budget was recorded; skip budget utilization in that case instead of reporting overspend.
+- Platform and channel names are exactly as they appear in the source data; repeat them verbatim and never rename or merge them.
+
+WHEN SEVERAL TASKS ARE SENT TOGETHER:
+- Treat each tagged task independently; never carry numbers from one task into another.
+- Answer every tag, even when its data is thin, following the expected answer for its task type.
+- Return only the JSON object requested, with plain-text values and no extra keys."""
+
+# Task-specific DATA blocks, compiled once into bound str.format callables
+_EXECUTIVE_TEMPLATE = """TASK: Executive summary of all advertising campaigns.
+
+OVERALL METRICS:
+- Total Campaigns: {total_campaigns}
+- Total Spend: ${total_spend:,.2f}
+- Total Impressions: {total_impressions:,}
+- Total Clicks: {total_clicks:,}
+- Overall CTR: {overall_ctr:.2f}%
+- Overall CPM: ${overall_cpm:.2f}
+- Overall CPC: ${overall_cpc:.2f}
+
+PLATFORM PERFORMANCE:
+{platforms}
+
+Provide a professional 3-4 sentence executive summary that:
+1. Highlights overall performance
+2. Identifies the best performing platform and why
+3. Gives 1-2 key actionable recommendations
+
+Keep it concise and business-focused.""".format
+
+_PLATFORM_TEMPLATE = """TASK: Analyze this {platform_name} campaign performance.
+
+PLATFORM: {platform_name}
+
+METRICS:
+- Campaigns: {campaigns_count}
+- Total Spend: ${total_spend:,.2f}
+- Impressions: {total_impressions:,}
+- Clicks: {total_clicks:,}
+- Average CTR: {avg_ctr:.2f}%
+- Average CPM: ${avg_cpm:.2f}
+- Average CPC: ${avg_cpc:.2f}
+
+Provide a 2-3 sentence analysis that:
+1. Evaluates the performance (good/needs improvement)
+2. Compares key metrics to the industry benchmarks for this platform
+3. Suggests one specific optimization
+
+Be professional and actionable.""".format
+
+_CAMPAIGN_TEMPLATE = """TASK: Analyze this advertising campaign performance.
+
+CAMPAIGN ID: {campaign_id}
+
+OVERVIEW:
+- Duration: {days_running} days
+- Total Spend: ${total_spend:,.2f}
+- Budget: ${budget:,.2f}
+- Impressions: {total_impressions:,}
+- Clicks: {total_clicks:,}
+- CTR: {avg_ctr:.2f}%
+- CPM: ${avg_cpm:.2f}
+- CPC: ${avg_cpc:.2f}
+
+CHANNELS:
+- Best: {best_channel}
+- Worst: {worst_channel}
+
+Provide 2-3 sentences that:
+1. Assess overall campaign performance (budget utilization, efficiency)
+2. Identify what's working well
+3. Give ONE specific recommendation to improve results
+
+Be direct and actionable.""".format
+
+_RECOMMENDATIONS_TEMPLATE = """TASK: Provide strategic recommendations based on this campaign data.
+
+OVERALL PERFORMANCE:
+- Total Campaigns: {total_campaigns}
+- Total Spend: ${total_spend:,.2f}
+- Overall CTR: {overall_ctr:.2f}%
+- Overall CPC: ${overall_cpc:.2f}
+
+TOP CHANNEL: {top_channel}
+
+Provide 3 specific, actionable recommendations to:
+1. Improve overall campaign performance
+2. Optimize budget allocation
+3. Increase ROI
+
+Number them 1-3 and keep each to 1 sentence. Be concrete and actionable.""".format
+
+
+def _build_prompt(block):
+    """Prefix a task-specific DATA block with the shared preamble"""
+    return _SYSTEM_PREAMBLE + "\n\nDATA:\n" + block
+
+
+def _estimate_tokens(text):
+    """Rough Gemini token count (about 4 characters per token)"""
+    return len(text) // 4
+
+
+# Prompts whose estimate exceeds the budget list only the top platforms by spend
+_MAX_INPUT_TOKENS = AI_CONFIG.get('max_input_tokens', 4000)
+_PROMPT_TOP_PLATFORMS = 15
+
+
+def _trim_platforms(platforms, k=_PROMPT_TOP_PLATFORMS):
+    """Top-k platform records by spend"""
+    return sorted(platforms, key=lambda p: -p['media_cost_usd'])[:k]
+
+
+def _channel_ctr_text(channel):
+    """Describe a channel record as 'Name (x.xx% CTR)' for prompts"""
+    if channel is None:
+        return 'N/A'
+    return f"{channel['channel_name']} ({_FMT_PCT(channel['ctr'])} CTR)"
+
+
+RankedByCTR = namedtuple('RankedByCTR', ['best', 'worst'])
+
+# One tagged task in a batched request: its DATA block, plus the single-request
+# prompt builder and template fallback (both called with args) to recover with
+InsightRequest = namedtuple('InsightRequest', ['tag', 'block', 'build_prompt', 'fallback', 'args'])
+
+# Batched requests are split so no single response runs into Gemini's output limit
+_BATCH_MAX_TOKENS = AI_CONFIG.get('batch_max_tokens', 4 * _MAX_INPUT_TOKENS)
+_BATCH_MAX_SECTIONS = AI_CONFIG.get('batch_max_sections', 8)
+
+
+def _pack_batches(requests, max_tokens=_BATCH_MAX_TOKENS, max_sections=_BATCH_MAX_SECTIONS):
+    """Group requests, in order, into batches within the token and section limits"""
+    batches, batch, batch_tokens = [], [], 0
+    for request in requests:
+        tokens = _estimate_tokens(request.block)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) == max_sections):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(request)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _ranked(holder, records_key, name):
+    """Best/worst records of holder[records_key] by CTR, via the row indices DataProcessor attaches"""
+    best_key, worst_key = f"best_{name}_idx", f"worst_{name}_idx"
+    records = holder[records_key]
+    if best_key in holder:
+        best, worst = holder[best_key], holder[worst_key]
+    elif records:
+        # holder may be DataProcessor's memoized analysis, so rank locally without writing to it
+        ctr = np.fromiter((record['ctr'] for record in records), dtype=float, count=len(records))
+        best, worst = int(ctr.argmax()), int(ctr.argmin())
+    else:
+        best = worst = None
+    if best is None:
+        return RankedByCTR(None, None)
+    return RankedByCTR(records[best], records[worst])
+
+
+# Pre-bound number formatters reused by the prompt helpers
+_FMT_PCT = "{:.2f}%".format
+_FMT_MONEY_WHOLE = "${:,.0f}".format
+
+
+def _platform_line(row):
+    """Format one (name, ctr, spend) row of the prompt's platform list"""
+    name, ctr, spend = row
+    return f"- {name}: {_FMT_PCT(ctr)} CTR, {_FMT_MONEY_WHOLE(spend)} spend"
+
+
+@functools.lru_cache(maxsize=64)
+def _format_platform_rows(rows):
+    """Join (name, ctr, spend) rows into the prompt's platform list"""
+    return "\n".join(map(_platform_line, rows))
+
+
+class _TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+    
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def consume(self, amount=1):
+        """Block until `amount` tokens are available, then take them"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Refill a Redis-held bucket and take `amount` from it atomically, returning the
+# seconds to wait first (as a string, since Redis truncates Lua numbers to integers)
+_REDIS_BUCKET_SCRIPT = """
+local capacity, rate, amount = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+local wait = 0
+if tokens >= amount then
+    tokens = tokens - amount
+else
+    wait = (amount - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+_REDIS_URL = AI_CONFIG.get('redis_url', os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+
+# Processes sharing the API key (gunicorn workers plus the RQ worker), used to
+# split the quota between them when Redis is unreachable
+_QUOTA_PROCESSES = max(1, AI_CONFIG.get('quota_processes', 1))
+
+
+class _SharedTokenBucket:
+    """Token bucket kept in Redis so every process using the API key draws from one quota"""
+    
+    def __init__(self, name, per_minute):
+        self.key = f"ai_quota:{name}"
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        # This process's share of the quota, used while Redis is unavailable
+        self.local = _TokenBucket(per_minute / _QUOTA_PROCESSES)
+        self.script = None
+        self.checked = False
+        self.lock = threading.Lock()
+    
+    def _get_script(self):
+        """Bucket script registered on Redis, or None to use the local share (checked once per process)"""
+        with self.lock:
+            if not self.checked:
+                self.checked = True
+                if Redis is not None:
+                    try:
+                        connection = Redis.from_url(_REDIS_URL, socket_connect_timeout=1)
+                        connection.ping()
+                        self.script = connection.register_script(_REDIS_BUCKET_SCRIPT)
+                    except Exception as e:
+                        print(f"⚠️  Redis unavailable ({str(e)}), Gemini {self.key} quota is split "
+                              f"across {_QUOTA_PROCESSES} process(es)")
+        return self.script
+    
+    def consume(self, amount=1):
+        """Block until `amount` tokens are available in the shared quota, then take them"""
+        script = self._get_script()
+        if script is None:
+            return self.local.consume(amount)
+        amount = min(amount, self.capacity)
+        while True:
+            try:
+                wait = float(script(keys=[self.key], args=[self.capacity, self.rate, amount]))
+            except RedisError as e:
+                print(f"Redis quota check failed ({str(e)}), using this process's share")
+                return self.local.consume(amount)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+# Quotas apply per API key, across every worker process using it
+_REQUEST_BUCKET = _SharedTokenBucket('requests', AI_CONFIG.get('requests_per_minute', 15))
+_TOKEN_BUCKET = _SharedTokenBucket('tokens', AI_CONFIG.get('tokens_per_minute', 1_000_000))
+
 
 class AIInsightsGenerator:
     def __init__(self):
@@ -16,179 +397,400 @@ class AIInsightsGenerator:
                 print("⚠️  Warning: Gemini API key not configured. Using fallback insights.")
                 self.enabled = False
             else:
-                genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel(AI_CONFIG.get('model', 'gemini-1.5-flash'))
+                # One client per process, shared by every thread. gRPC (one HTTP/2
+                # channel) by default; REST under gevent, whose patched sockets yield
+                transport = AI_CONFIG.get('transport', 'rest' if _UNDER_GEVENT else 'grpc')
+                genai.configure(api_key=api_key, transport=transport)
+                self.model_name = AI_CONFIG.get('model', 'gemini-1.5-flash')
+                # Generation settings per output mode, also part of every response cache key
+                self.generation_configs = {
+                    'text': {},
+                    'json': {"response_mime_type": "application/json"}
+                }
+                self.model = genai.GenerativeModel(
+                    self.model_name,
+                    generation_config=self.generation_configs['text']
+                )
+                self.json_model = genai.GenerativeModel(
+                    self.model_name,
+                    generation_config=self.generation_configs['json']
+                )
+                self.cache = diskcache.Cache(
+                    AI_CONFIG.get('cache_dir', './.ai_cache'),
+                    size_limit=512 * 1024 * 1024
+                )
                 print("✅ Gemini AI enabled for insights generation")
     
+    def warm_up(self):
+        """Send a 1-token request so the first report doesn't pay connection setup"""
+        if not self.enabled:
+            return
+        try:
+            _REQUEST_BUCKET.consume()
+            self.model.generate_content("ping", generation_config={"max_output_tokens": 1})
+            preamble_tokens = self.model.count_tokens(_SYSTEM_PREAMBLE).total_tokens
+            print(f"Gemini prompt preamble: {preamble_tokens} tokens "
+                  f"(implicit caching needs at least {_IMPLICIT_CACHE_MIN_TOKENS})")
+        except Exception as e:
+            print(f"Gemini warm-up failed: {str(e)}")
+    
+    def _cached_generate(self, prompt, json_mode=False):
+        """Return the response text for a prompt, reusing cached responses"""
+        model = self.json_model if json_mode else self.model
+        key = self._cache_key(prompt, json_mode)
+        
+        text = self.cache.get(key)
+        if text is None:
+            response = self._generate_with_retry(model, prompt)
+            self._log_usage(response)
+            text = response.text
+            self.cache.set(key, text, expire=AI_CONFIG.get('cache_ttl', 86400))
+        return text
+    
+    def _cache_key(self, prompt, json_mode=False):
+        """Response cache key for a prompt, output mode, model and generation settings"""
+        mode = 'json' if json_mode else 'text'
+        settings = json.dumps(self.generation_configs[mode], sort_keys=True)
+        return hashlib.sha256(f"{self.model_name}:{mode}:{settings}:{prompt}".encode()).hexdigest()
+    
+    def _generate_with_retry(self, model, prompt, **kwargs):
+        """Call Gemini within the client-side quota, backing off on 429 responses"""
+        max_retries = AI_CONFIG.get('max_retries', 5)
+        for attempt in range(max_retries + 1):
+            _REQUEST_BUCKET.consume()
+            _TOKEN_BUCKET.consume(_estimate_tokens(prompt))
+            try:
+                return model.generate_content(prompt, **kwargs)
+            except ResourceExhausted:
+                if attempt == max_retries:
+                    raise
+                delay = min(2 ** attempt, 60) + random.random()
+                print(f"Gemini quota exhausted, retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _log_usage(self, response):
+        """Log prompt and implicit-cache token counts to tune the shared preamble"""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            print(f"Gemini usage: {usage.prompt_token_count} prompt tokens, "
+                  f"{getattr(usage, 'cached_content_token_count', 0)} served from cache")
+    
     def generate_executive_summary(self, cross_analysis):
         """Generate executive summary from overall data"""
         if not self.enabled:
             return self._fallback_executive_summary(cross_analysis)
         
         try:
-            metrics = cross_analysis['overall_metrics']
-            platforms = cross_analysis['platform_comparison']
-            
-            prompt = f"""You are an expert AdTech analyst. Analyze this advertising campaign data and provide a concise executive summary.
-
-DATA:
-- Total Campaigns: {metrics['total_campaigns']}
-- Total Spend: ${metrics['total_spend']:,.2f}
-- Total Impressions: {metrics['total_impressions']:,}
-- Total Clicks: {metrics['total_clicks']:,}
-- Overall CTR: {metrics['overall_ctr']:.2f}%
-- Overall CPM: ${metrics['overall_cpm']:.2f}
-- Overall CPC: ${metrics['overall_cpc']:.2f}
-
-PLATFORM PERFORMANCE:
-{self._format_platforms(platforms)}
-
-Provide a professional 3-4 sentence executive summary that:
-1. Highlights overall performance
-2. Identifies the best performing platform and why
-3. Gives 1-2 key actionable recommendations
-
-Keep it concise and business-focused."""
-
-            response = self.model.generate_content(prompt)
-            return response.text
+            prompt = self._executive_prompt(cross_analysis)
+            return self._cached_generate(prompt)
             
         except Exception as e:
             print(f"Error generating AI insight: {e}")
             return self._fallback_executive_summary(cross_analysis)
     
+    def stream_executive_summary(self, cross_analysis):
+        """Yield the executive summary in chunks as Gemini generates it"""
+        if not self.enabled:
+            yield self._fallback_executive_summary(cross_analysis)
+            return
+        
+        prompt = self._executive_prompt(cross_analysis)
+        key = self._cache_key(prompt)
+        text = self.cache.get(key)
+        if text is not None:
+            yield text
+            return
+        
+        parts = []
+        try:
+            response = self._generate_with_retry(self.model, prompt, stream=True)
+            for chunk in response:
+                parts.append(chunk.text)
+                yield chunk.text
+            
+        except Exception as e:
+            print(f"Error streaming executive summary: {e}")
+            if parts:
+                # Part of the summary already went out; let the caller report the
+                # failure instead of ending the stream as if it were complete
+                raise
+            yield self._fallback_executive_summary(cross_analysis)
+            return
+        
+        self._log_usage(response)
+        self.cache.set(key, "".join(parts), expire=AI_CONFIG.get('cache_ttl', 86400))
+    
+    def fallback_executive_summary(self, cross_analysis):
+        """Template executive summary, for callers recovering from a failed AI request"""
+        return self._fallback_executive_summary(cross_analysis)
+    
+    def _executive_prompt(self, cross_analysis):
+        """Build the executive summary prompt"""
+        return _build_prompt(self._executive_block(cross_analysis))
+    
+    def _executive_block(self, cross_analysis):
+        """Build the executive summary DATA block, trimming platforms to the token budget"""
+        platforms = cross_analysis['platform_comparison']
+        block = _EXECUTIVE_TEMPLATE(
+            **cross_analysis['overall_metrics'],
+            platforms=self._format_platforms(platforms)
+        )
+        if (len(platforms) > _PROMPT_TOP_PLATFORMS
+                and _estimate_tokens(_build_prompt(block)) > _MAX_INPUT_TOKENS):
+            trimmed = self._format_platforms(_trim_platforms(platforms))
+            block = _EXECUTIVE_TEMPLATE(
+                **cross_analysis['overall_metrics'],
+                platforms=f"(showing top {_PROMPT_TOP_PLATFORMS} of {len(platforms)} platforms by spend)\n{trimmed}"
+            )
+        return block
+    
     def generate_platform_insight(self, platform_name, platform_data):
         """Generate insights for a specific platform"""
         if not self.enabled:
             return self._fallback_platform_insight(platform_name, platform_data)
         
         try:
-            summary = platform_data['summary']
-            
-            prompt = f"""You are an AdTech analyst. Analyze this {platform_name} campaign performance.
-
-PLATFORM: {platform_name}
-
-METRICS:
-- Campaigns: {summary['campaigns_count']}
-- Total Spend: ${summary['total_spend']:,.2f}
-- Impressions: {summary['total_impressions']:,}
-- Clicks: {summary['total_clicks']:,}
-- Average CTR: {summary['avg_ctr']:.2f}%
-- Average CPM: ${summary['avg_cpm']:.2f}
-- Average CPC: ${summary['avg_cpc']:.2f}
-
-Provide a 2-3 sentence analysis that:
-1. Evaluates the performance (good/needs improvement)
-2. Compares key metrics to industry standards (typical CTR for this platform is 1.5-3%)
-3. Suggests one specific optimization
-
-Be professional and actionable."""
-
-            response = self.model.generate_content(prompt)
-            return response.text
+            prompt = self._platform_prompt(platform_name, platform_data)
+            return self._cached_generate(prompt)
             
         except Exception as e:
             print(f"Error generating platform insight: {e}")
             return self._fallback_platform_insight(platform_name, platform_data)
     
+    def _platform_prompt(self, platform_name, platform_data):
+        """Build the platform insight prompt"""
+        return _build_prompt(self._platform_block(platform_name, platform_data))
+    
+    def _platform_block(self, platform_name, platform_data):
+        """Build the platform insight DATA block"""
+        return _PLATFORM_TEMPLATE(platform_name=platform_name, **platform_data['summary'])
+    
     def generate_campaign_insight(self, campaign_id, analysis):
         """Generate insights for a specific campaign"""
         if not self.enabled:
             return self._fallback_campaign_insight(campaign_id, analysis)
         
         try:
-            summary = analysis['summary']
-            channels = analysis['channels']['by_channel']
-            
-            # Find best and worst channels
-            best_channel = max(channels, key=lambda x: x['ctr']) if channels else None
-            worst_channel = min(channels, key=lambda x: x['ctr']) if channels else None
-            
-            prompt = f"""Analyze this advertising campaign performance.
-
-CAMPAIGN ID: {campaign_id}
-
-OVERVIEW:
-- Duration: {summary['days_running']} days
-- Total Spend: ${summary['total_spend']:,.2f}
-- Budget: ${summary['budget']:,.2f}
-- Impressions: {summary['total_impressions']:,}
-- Clicks: {summary['total_clicks']:,}
-- CTR: {summary['avg_ctr']:.2f}%
-- CPM: ${summary['avg_cpm']:.2f}
-- CPC: ${summary['avg_cpc']:.2f}
-
-CHANNELS:
-- Best: {best_channel['channel_name'] if best_channel else 'N/A'} ({best_channel['ctr']:.2f}% CTR if best_channel else 'N/A')
-- Worst: {worst_channel['channel_name'] if worst_channel else 'N/A'} ({worst_channel['ctr']:.2f}% CTR if worst_channel else 'N/A')
-
-Provide 2-3 sentences that:
-1. Assess overall campaign performance (budget utilization, efficiency)
-2. Identify what's working well
-3. Give ONE specific recommendation to improve results
-
-Be direct and actionable."""
-
-            response = self.model.generate_content(prompt)
-            return response.text
+            prompt = self._campaign_prompt(campaign_id, analysis)
+            return self._cached_generate(prompt)
             
         except Exception as e:
             print(f"Error generating campaign insight: {e}")
             return self._fallback_campaign_insight(campaign_id, analysis)
     
+    def _campaign_prompt(self, campaign_id, analysis):
+        """Build the campaign insight prompt"""
+        return _build_prompt(self._campaign_block(campaign_id, analysis))
+    
+    def _campaign_block(self, campaign_id, analysis):
+        """Build the campaign insight DATA block"""
+        channels = _ranked(analysis['channels'], 'by_channel', 'channel')
+        
+        return _CAMPAIGN_TEMPLATE(
+            campaign_id=campaign_id,
+            best_channel=_channel_ctr_text(channels.best),
+            worst_channel=_channel_ctr_text(channels.worst),
+            **analysis['summary']
+        )
+    
     def generate_recommendations(self, cross_analysis):
         """Generate overall recommendations"""
         if not self.enabled:
             return self._fallback_recommendations(cross_analysis)
         
         try:
-            metrics = cross_analysis['overall_metrics']
-            channels = cross_analysis['channel_comparison']
+            prompt = self._recommendations_prompt(cross_analysis)
+            return self._cached_generate(prompt)
             
-            top_channel = max(channels, key=lambda x: x['ctr']) if channels else None
+        except Exception as e:
+            print(f"Error generating recommendations: {e}")
+            return self._fallback_recommendations(cross_analysis)
+    
+    def _recommendations_prompt(self, cross_analysis):
+        """Build the recommendations prompt"""
+        return _build_prompt(self._recommendations_block(cross_analysis))
+    
+    def _recommendations_block(self, cross_analysis):
+        """Build the recommendations DATA block"""
+        top_channel = _ranked(cross_analysis, 'channel_comparison', 'channel').best
+        
+        return _RECOMMENDATIONS_TEMPLATE(
+            top_channel=_channel_ctr_text(top_channel),
+            **cross_analysis['overall_metrics']
+        )
+    
+    def generate_all_insights(self, cross_analysis, per_platform, per_campaign):
+        """Generate every report insight with as few structured Gemini requests as possible
+        
+        Returns a dict with 'executive_summary', 'platforms' (keyed by platform
+        name), 'campaigns' (keyed by campaign id) and 'recommendations'.
+        """
+        if not self.enabled:
+            return self._fallback_all_insights(cross_analysis, per_platform, per_campaign)
+        
+        if not AI_CONFIG.get('batch_insights', True):
+            return self._gather_all_insights(cross_analysis, per_platform, per_campaign)
+        
+        try:
+            requests = self._insight_requests(cross_analysis, per_platform, per_campaign)
+            texts = self.generate_batch(requests)
             
-            prompt = f"""As an AdTech consultant, provide strategic recommendations based on this campaign data.
-
-OVERALL PERFORMANCE:
-- Total Campaigns: {metrics['total_campaigns']}
-- Total Spend: ${metrics['total_spend']:,.2f}
-- Overall CTR: {metrics['overall_ctr']:.2f}%
-- Overall CPC: ${metrics['overall_cpc']:.2f}
-
-TOP CHANNEL: {top_channel['channel_name'] if top_channel else 'N/A'} ({top_channel['ctr']:.2f}% CTR if top_channel else 'N/A')
-
-Provide 3 specific, actionable recommendations to:
-1. Improve overall campaign performance
-2. Optimize budget allocation
-3. Increase ROI
+        except Exception as e:
+            print(f"Error generating batched insights: {e}")
+            return self._fallback_all_insights(cross_analysis, per_platform, per_campaign)
+        
+        return {
+            'executive_summary': texts['EXEC'],
+            'platforms': {name: texts[f"PLATFORM:{name}"] for name in per_platform},
+            'campaigns': {campaign_id: texts[f"CAMPAIGN:{campaign_id}"] for campaign_id in per_campaign},
+            'recommendations': texts['RECS']
+        }
+    
+    def _insight_requests(self, cross_analysis, per_platform, per_campaign):
+        """Every report insight as a tagged InsightRequest, in report order"""
+        requests = [InsightRequest('EXEC', self._executive_block(cross_analysis),
+                                   self._executive_prompt, self._fallback_executive_summary, (cross_analysis,))]
+        for name, data in per_platform.items():
+            requests.append(InsightRequest(f"PLATFORM:{name}", self._platform_block(name, data),
+                                           self._platform_prompt, self._fallback_platform_insight, (name, data)))
+        for campaign_id, analysis in per_campaign.items():
+            requests.append(InsightRequest(f"CAMPAIGN:{campaign_id}", self._campaign_block(campaign_id, analysis),
+                                           self._campaign_prompt, self._fallback_campaign_insight, (campaign_id, analysis)))
+        requests.append(InsightRequest('RECS', self._recommendations_block(cross_analysis),
+                                       self._recommendations_prompt, self._fallback_recommendations, (cross_analysis,)))
+        return requests
+    
+    def generate_batch(self, requests):
+        """Answer InsightRequests with token-budgeted JSON requests run concurrently
+        
+        Returns a dict of answer text keyed by request tag. Requests that fail
+        get their template fallback; a batch whose response isn't a JSON object
+        is retried one request at a time.
+        """
+        if not self.enabled:
+            return {request.tag: request.fallback(*request.args) for request in requests}
+        batches = _pack_batches(requests)
+        texts, retries = {}, []
+        for batch, answers in zip(batches, self._run_concurrently([(self._batch, batch) for batch in batches])):
+            if answers is None:
+                retries.extend(batch)
+            else:
+                texts.update(answers)
+        
+        # Retried as a second pass, not from inside _batch, so the retries never
+        # wait on a pool whose threads are all busy with batches
+        if retries:
+            answers = self._run_concurrently([
+                (self._insight, request.build_prompt, request.fallback, *request.args)
+                for request in retries
+            ])
+            texts.update(zip((request.tag for request in retries), answers))
+        return texts
+    
+    def _batch(self, batch):
+        """Answer one batch of InsightRequests with a single structured Gemini request
+        
+        Returns answers keyed by tag, or None if the response isn't a JSON object.
+        """
+        try:
+            response_text = self._cached_generate(self._batch_prompt(batch), True)
+            
+        except Exception as e:
+            print(f"Error generating batched insights: {e}")
+            return {request.tag: request.fallback(*request.args) for request in batch}
+        
+        try:
+            sections = json.loads(response_text)
+            if not isinstance(sections, dict):
+                raise ValueError("expected a JSON object")
+            
+        except ValueError as e:
+            print(f"Unusable batched insights response ({e}), requesting insights individually")
+            return None
+        
+        answers = {}
+        for request in batch:
+            text = sections.get(request.tag)
+            answers[request.tag] = text if isinstance(text, str) and text.strip() else request.fallback(*request.args)
+        return answers
+    
+    def _batch_prompt(self, batch):
+        """Build one prompt holding each request in the batch as a tagged section"""
+        sections = [f"<<{request.tag}>>\n{request.block}" for request in batch]
+        
+        return _build_prompt("""The data below holds several independent analysis tasks. Each task starts with a tag line such as <<EXEC>>, <<PLATFORM:name>>, <<CAMPAIGN:id>> or <<RECS>>.
 
-Number them 1-3 and keep each to 1 sentence. Be concrete and actionable."""
+Answer every task and return a single JSON object whose keys are the tags without the angle brackets (for example "EXEC", "PLATFORM:Google Ads", "CAMPAIGN:3155", "RECS") and whose values are the plain-text answers.
 
-            response = self.model.generate_content(prompt)
-            return response.text
+""" + "\n\n".join(sections))
+    
+    def _gather_all_insights(self, cross_analysis, per_platform, per_campaign):
+        """Concurrent counterpart of generate_all_insights, one request per insight"""
+        try:
+            requests = self._insight_requests(cross_analysis, per_platform, per_campaign)
+            texts = self._run_concurrently([
+                (self._insight, request.build_prompt, request.fallback, *request.args)
+                for request in requests
+            ])
+            texts = {request.tag: text for request, text in zip(requests, texts)}
             
         except Exception as e:
-            print(f"Error generating recommendations: {e}")
-            return self._fallback_recommendations(cross_analysis)
+            print(f"Error generating insights concurrently: {e}")
+            return self._fallback_all_insights(cross_analysis, per_platform, per_campaign)
+        
+        return {
+            'executive_summary': texts['EXEC'],
+            'platforms': {name: texts[f"PLATFORM:{name}"] for name in per_platform},
+            'campaigns': {campaign_id: texts[f"CAMPAIGN:{campaign_id}"] for campaign_id in per_campaign},
+            'recommendations': texts['RECS']
+        }
+    
+    def _run_concurrently(self, calls):
+        """Run (function, *args) calls on a bounded thread pool, returning their results in order"""
+        # Threads rather than asyncio.run(): two reports in one gevent worker would
+        # nest event loops, while patched threads are greenlets that yield on I/O
+        with ThreadPoolExecutor(max_workers=AI_CONFIG.get('max_concurrency', 8)) as executor:
+            futures = [executor.submit(*call) for call in calls]
+            return [future.result() for future in futures]
+    
+    def _insight(self, build_prompt, fallback, *args):
+        """Run one blocking Gemini request, falling back on any error"""
+        try:
+            return self._cached_generate(build_prompt(*args))
+            
+        except Exception as e:
+            print(f"Error generating insight concurrently: {e}")
+            return fallback(*args)
     
     # Fallback methods (used when AI is disabled or fails)
     
+    def _fallback_all_insights(self, cross_analysis, per_platform, per_campaign):
+        """Fallback for the batched insights request"""
+        return {
+            'executive_summary': self._fallback_executive_summary(cross_analysis),
+            'platforms': {
+                name: self._fallback_platform_insight(name, data)
+                for name, data in per_platform.items()
+            },
+            'campaigns': {
+                campaign_id: self._fallback_campaign_insight(campaign_id, analysis)
+                for campaign_id, analysis in per_campaign.items()
+            },
+            'recommendations': self._fallback_recommendations(cross_analysis)
+        }
+    
     def _format_platforms(self, platforms):
         """Format platform data for prompt"""
-        result = []
-        for p in platforms:
-            result.append(f"- {p['ext_service_name']}: {p['ctr']:.2f}% CTR, ${p['media_cost_usd']:,.0f} spend")
-        return "\n".join(result)
+        return _format_platform_rows(tuple(
+            (p['ext_service_name'], p['ctr'], p['media_cost_usd']) for p in platforms
+        ))
     
     def _fallback_executive_summary(self, cross_analysis):
         """Fallback summary when AI is not available"""
         metrics = cross_analysis['overall_metrics']
-        platforms = cross_analysis['platform_comparison']
+        best_platform = _ranked(cross_analysis, 'platform_comparison', 'platform').best
         
-        best_platform = max(platforms, key=lambda x: x['ctr'])
-        
-        return f"""The advertising campaigns generated {metrics['total_impressions']:,} impressions and {metrics['total_clicks']:,} clicks across {metrics['total_campaigns']} campaigns, with a total spend of ${metrics['total_spend']:,.2f}. The overall CTR of {metrics['overall_ctr']:.2f}% indicates {'strong' if metrics['overall_ctr'] > 2 else 'moderate'} engagement. {best_platform['ext_service_name']} delivered the highest CTR at {best_platform['ctr']:.2f}%, demonstrating superior audience targeting and creative effectiveness. Consider reallocating budget towards high-performing platforms and optimizing underperforming campaigns through A/B testing and refined audience segmentation."""
+        return f"""The advertising campaigns generated {metrics['total_impressions']:,} impressions and {metrics['total_clicks']:,} clicks across {metrics['total_campaigns']} campaigns, with a total spend of ${metrics['total_spend']:,.2f}. The overall CTR of {metrics['overall_ctr']:.2f}% indicates {'strong' if metrics['overall_ctr'] > 2 else 'moderate'} engagement. {f"{best_platform['ext_service_name']} delivered the highest CTR at {best_platform['ctr']:.2f}%, demonstrating superior audience targeting and creative effectiveness. " if best_platform else ""}Consider reallocating budget towards high-performing platforms and optimizing underperforming campaigns through A/B testing and refined audience segmentation."""
     
     def _fallback_platform_insight(self, platform_name, platform_data):
         """Fallback platform insight"""
@@ -199,19 +801,20 @@ Number them 1-3 and keep each to 1 sentence. Be concrete and actionable."""
     def _fallback_campaign_insight(self, campaign_id, analysis):
         """Fallback campaign insight"""
         summary = analysis['summary']
-        channels = analysis['channels']['by_channel']
-        
-        best_channel = max(channels, key=lambda x: x['ctr']) if channels else None
+        best_channel = _ranked(analysis['channels'], 'by_channel', 'channel').best
         
         return f"""Campaign {campaign_id} ran for {summary['days_running']} days, generating {summary['total_clicks']:,} clicks from {summary['total_impressions']:,} impressions with a {summary['avg_ctr']:.2f}% CTR. Total spend of ${summary['total_spend']:,.2f} resulted in an average CPC of ${summary['avg_cpc']:.2f}. {f"{best_channel['channel_name']} delivered the highest CTR at {best_channel['ctr']:.2f}%, demonstrating strong channel-message fit. Consider increasing investment in this channel." if best_channel else ""} {'The campaign is performing well relative to budget. Focus on scaling successful elements.' if summary['total_spend'] < summary['budget'] * 0.8 else 'Campaign is approaching budget limits. Evaluate ROI and consider budget reallocation if underperforming.'}"""
     
     def _fallback_recommendations(self, cross_analysis):
         """Fallback recommendations"""
-        metrics = cross_analysis['overall_metrics']
-        channels = cross_analysis['channel_comparison']
-        
-        top_channel = max(channels, key=lambda x: x['ctr']) if channels else None
+        top_channel = _ranked(cross_analysis, 'channel_comparison', 'channel').best
         
         return f"""1. Reallocate budget towards {top_channel['channel_name'] if top_channel else 'high-performing channels'} which shows superior engagement rates.
 2. Implement A/B testing on underperforming campaigns to identify optimization opportunities in creative and targeting.
 3. Consider pausing campaigns with CTR below 1.5% and reallocating budget to campaigns exceeding 3% CTR for improved overall ROI."""
+
+
+@functools.lru_cache(maxsize=1)
+def get_generator():
+    """Process-wide AIInsightsGenerator, so the client and its connection are built once"""
+    return AIInsightsGenerator()
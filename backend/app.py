@@ -1,15 +1,58 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+import orjson
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 from datetime import datetime
+from collections import OrderedDict
+from urllib.parse import quote
 import os
 import json
+import shutil
+import threading
 from report_generator import ReportGenerator
 from data_processor import DataProcessor
+from ai_insights import get_generator
 import traceback
 
+try:
+    from redis import Redis
+    from rq import Queue
+    from rq.job import Job
+    from rq.exceptions import NoSuchJobError
+except ImportError:
+    Redis = None
+
+def _json_default(obj):
+    """Serialize the numpy/pandas values orjson doesn't handle natively"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider that encodes responses with orjson"""
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_json_default, option=self.options).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping the str round-trip
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_json_default, option=self.options)
+        return self._app.response_class(body, mimetype='application/json')
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
 
 # Configuration
@@ -21,6 +64,132 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
+# Let the fronting web server stream reports itself. USE_X_SENDFILE sends an
+# X-Sendfile header with the absolute path (Apache mod_xsendfile, lighttpd);
+# nginx ignores it and instead needs X_ACCEL_REDIRECT_PREFIX, the URI of an
+# `internal` location aliased to the outputs folder (e.g. /protected-reports/)
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+app.config['X_ACCEL_REDIRECT_PREFIX'] = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '')
+
+# Minimum columns DataProcessor needs to build the campaign list
+CAMPAIGN_LIST_COLUMNS = ['campaign_item_id', 'time', 'ext_service_name', 'impressions', 'clicks', 'media_cost_usd']
+
+# Every column the analyses and reports read; the rest of an upload is never loaded
+ANALYSIS_COLUMNS = CAMPAIGN_LIST_COLUMNS + [
+    'channel_name', 'campaign_budget_usd', 'weekday_cat', 'keywords', 'search_tags',
+    'landing_page', 'template_id', 'creative_width', 'creative_height',
+    'total_reach', 'unique_reach'
+]
+
+# Column types fixed at parse time; low-cardinality strings are dictionary-encoded
+# so they load as pandas categoricals (spend stays float64 to keep cents exact).
+# Counts and ids are left to inference, like pd.read_csv, so exports that write
+# them as "837.0" still load; DataProcessor.clean_data narrows them afterwards.
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+_SCHEMA = {
+    'ext_service_name': _CATEGORY,
+    'channel_name': _CATEGORY,
+    'media_cost_usd': pa.float64()
+}
+
+def _select_columns(table, columns):
+    """Project an Arrow table onto the listed columns it has"""
+    return table.select([col for col in columns if col in table.column_names])
+
+def _read_csv_table(filepath, columns=None):
+    """Parse a CSV with Arrow's multi-threaded reader, keeping only `columns` if given"""
+    table = pv.read_csv(
+        filepath,
+        read_options=pv.ReadOptions(use_threads=True, block_size=8 << 20),
+        convert_options=pv.ConvertOptions(strings_can_be_null=True, column_types=_SCHEMA)
+    )
+    if columns is not None:
+        table = _select_columns(table, columns)
+    # An all-empty column comes back as Arrow's null type (object in pandas);
+    # read it as float64 like pd.read_csv so fillna and the numeric sums see it
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, pa.nulls(table.num_rows, pa.float64()))
+    return table
+
+def _sort_categories(df):
+    """Order categorical levels alphabetically so groupbys sort as they did on strings"""
+    for col in df.select_dtypes(include='category').columns:
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+def _parquet_path(filepath):
+    """Path of the Parquet copy written next to an uploaded CSV"""
+    return filepath + '.parquet'
+
+def _load_dataframe(filepath, columns=None):
+    """Load an uploaded file, preferring its Parquet copy over re-parsing the CSV"""
+    parquet_path = _parquet_path(filepath)
+    if os.path.exists(parquet_path):
+        if columns is not None:
+            available = set(pq.read_schema(parquet_path).names)
+            columns = [col for col in columns if col in available]
+        return _sort_categories(pd.read_parquet(parquet_path, columns=columns, memory_map=True))
+    
+    return _sort_categories(_read_csv_table(filepath, columns).to_pandas())
+
+# Recently built processors, keyed by (filepath, mtime, columns), evicted LRU-first
+PROCESSOR_CACHE_SIZE = 8
+_PROCESSOR_CACHE = OrderedDict()
+_PROCESSOR_CACHE_LOCK = threading.Lock()
+
+def _get_processor(filepath, columns=None):
+    """Return a DataProcessor for an uploaded file, reusing one built by an earlier request"""
+    key = (filepath, os.path.getmtime(filepath), tuple(columns) if columns else None)
+    with _PROCESSOR_CACHE_LOCK:
+        processor = _PROCESSOR_CACHE.get(key)
+        if processor is not None:
+            _PROCESSOR_CACHE.move_to_end(key)
+            return processor
+    
+    processor = DataProcessor(_load_dataframe(filepath, columns))
+    with _PROCESSOR_CACHE_LOCK:
+        _PROCESSOR_CACHE[key] = processor
+        while len(_PROCESSOR_CACHE) > PROCESSOR_CACHE_SIZE:
+            _PROCESSOR_CACHE.popitem(last=False)
+    return processor
+
+# Reports are built by an RQ worker ("rq worker reports") when Redis is reachable
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+REPORT_QUEUE_NAME = 'reports'
+REPORT_JOB_TIMEOUT = 600
+REPORT_RESULT_TTL = 24 * 3600
+_REPORT_QUEUE = None
+_REPORT_QUEUE_CHECKED = False
+
+def _get_report_queue():
+    """RQ queue for report jobs, or None to build reports in-request (checked once per process)"""
+    global _REPORT_QUEUE, _REPORT_QUEUE_CHECKED
+    if not _REPORT_QUEUE_CHECKED:
+        _REPORT_QUEUE_CHECKED = True
+        if Redis is not None:
+            try:
+                connection = Redis.from_url(REDIS_URL, socket_connect_timeout=1)
+                connection.ping()
+                _REPORT_QUEUE = Queue(REPORT_QUEUE_NAME, connection=connection)
+                print(f"✅ Report jobs will be queued on {REDIS_URL}")
+            except Exception as e:
+                print(f"⚠️  Redis unavailable ({str(e)}), reports will be built in-request")
+    return _REPORT_QUEUE
+
+def generate_report_task(filepath, selected_campaigns, report_type):
+    """Build a PDF report for an uploaded file and return its file name"""
+    # Filter campaigns if specified
+    if selected_campaigns:
+        df = _load_dataframe(filepath, ANALYSIS_COLUMNS)
+        df = df[df['campaign_item_id'].isin(selected_campaigns)]
+        generator = ReportGenerator(df, app.config['OUTPUT_FOLDER'])
+    else:
+        processor = _get_processor(filepath, ANALYSIS_COLUMNS)
+        generator = ReportGenerator(processor.df, app.config['OUTPUT_FOLDER'], processor=processor)
+    
+    report_path = generator.generate_comprehensive_report(report_type)
+    return os.path.basename(report_path)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -47,10 +216,19 @@ def upload_file():
         # Save the file
         filename = f"data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # Stream to disk in 1MB chunks so memory stays flat regardless of upload size
+        with open(filepath, 'wb', buffering=1 << 20) as out:
+            shutil.copyfileobj(file.stream, out, length=1 << 20)
         
         # Load and validate data
-        df = pd.read_csv(filepath)
+        table = _read_csv_table(filepath)
+        df = _sort_categories(_select_columns(table, ANALYSIS_COLUMNS).to_pandas())
+        
+        # Keep a typed columnar copy so later requests skip CSV parsing
+        try:
+            pq.write_table(table, _parquet_path(filepath), compression='zstd')
+        except Exception as e:
+            print(f"Could not write Parquet copy of {filename}: {str(e)}")
         
         # Get data summary
         processor = DataProcessor(df)
@@ -83,8 +261,7 @@ def analyze_data():
             return jsonify({'error': 'File not found'}), 404
         
         # Load data
-        df = pd.read_csv(filepath)
-        processor = DataProcessor(df)
+        processor = _get_processor(filepath, ANALYSIS_COLUMNS)
         
         # Get analysis
         analysis = processor.get_full_analysis()
@@ -99,6 +276,53 @@ def analyze_data():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analyze/stream', methods=['GET'])
+def stream_analysis():
+    """Stream the AI executive summary as Server-Sent Events"""
+    try:
+        filename = request.args.get('filename')
+        
+        if not filename:
+            return jsonify({'error': 'No filename provided'}), 400
+        
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'}), 404
+        
+        cross_analysis = _get_processor(filepath, ANALYSIS_COLUMNS).get_cross_cutting_analysis()
+    
+    except Exception as e:
+        print(f"Error in analyze stream: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+    
+    def events():
+        generator = get_generator()
+        # Errors here arrive after the 200 headers, so they are reported as an
+        # error event carrying the template summary instead of an HTTP status
+        try:
+            for delta in generator.stream_executive_summary(cross_analysis):
+                yield f"data: {orjson.dumps({'delta': delta}).decode()}\n\n"
+        
+        except Exception as e:
+            print(f"Error in analyze stream: {str(e)}")
+            traceback.print_exc()
+            try:
+                summary = generator.fallback_executive_summary(cross_analysis)
+            except Exception:
+                traceback.print_exc()
+                summary = ''
+            yield f"event: error\ndata: {orjson.dumps({'error': str(e), 'summary': summary}).decode()}\n\n"
+        
+        # Tell the EventSource to close instead of reconnecting
+        yield "event: done\ndata: {}\n\n"
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/generate-report', methods=['POST'])
 def generate_report():
     """Generate PDF report for selected campaigns"""
@@ -115,20 +339,25 @@ def generate_report():
         if not os.path.exists(filepath):
             return jsonify({'error': 'File not found'}), 404
         
-        # Load data
-        df = pd.read_csv(filepath)
-        
-        # Filter campaigns if specified
-        if selected_campaigns:
-            df = df[df['campaign_item_id'].isin(selected_campaigns)]
+        # Hand the report to a worker; the client polls /api/download/<job_id>
+        queue = _get_report_queue()
+        if queue is not None:
+            job = queue.enqueue(
+                'app.generate_report_task', filepath, selected_campaigns, report_type,
+                job_timeout=REPORT_JOB_TIMEOUT, result_ttl=REPORT_RESULT_TTL
+            )
+            return jsonify({
+                'success': True,
+                'job_id': job.id,
+                'message': 'Report generation started'
+            }), 202
         
         # Generate report
-        generator = ReportGenerator(df, app.config['OUTPUT_FOLDER'])
-        report_path = generator.generate_comprehensive_report(report_type)
+        report_name = generate_report_task(filepath, selected_campaigns, report_type)
         
         return jsonify({
             'success': True,
-            'report_path': os.path.basename(report_path),
+            'report_path': report_name,
             'message': 'Report generated successfully'
         })
     
@@ -139,16 +368,53 @@ def generate_report():
 
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_report(filename):
-    """Download generated report"""
+    """Download generated report, by file name or by report job id"""
     try:
         filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
         if not os.path.exists(filepath):
-            return jsonify({'error': 'Report not found'}), 404
+            queue = _get_report_queue()
+            if queue is None:
+                return jsonify({'error': 'Report not found'}), 404
+            
+            try:
+                job = Job.fetch(filename, connection=queue.connection)
+            except NoSuchJobError:
+                return jsonify({'error': 'Report not found'}), 404
+            
+            # Stopped, canceled and expired jobs will never finish; only
+            # queued/started/deferred/scheduled jobs are still pending
+            status = job.get_status()
+            if status is None:
+                return jsonify({'error': 'Report not found'}), 404
+            if status == 'failed':
+                return jsonify({'error': 'Report generation failed'}), 500
+            if status in ('stopped', 'canceled'):
+                return jsonify({'error': 'Report generation was stopped before it finished'}), 410
+            if status != 'finished':
+                return jsonify({'status': status}), 202
+            
+            filename = job.result
+            filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
+            if not os.path.exists(filepath):
+                return jsonify({'error': 'Report not found'}), 404
+        
+        # nginx serves the file (and its conditional requests) from the internal location
+        if app.config['X_ACCEL_REDIRECT_PREFIX']:
+            response = Response(mimetype='application/pdf')
+            response.headers['X-Accel-Redirect'] = app.config['X_ACCEL_REDIRECT_PREFIX'].rstrip('/') + '/' + quote(filename)
+            response.headers.set('Content-Disposition', 'attachment', filename=filename)
+            return response
         
+        # Absolute path so the file is served from the server's working directory
+        # (and is valid in an X-Sendfile header); ETag/Last-Modified enable 304s
         return send_file(
-            filepath,
+            os.path.abspath(filepath),
             as_attachment=True,
-            download_name=filename
+            download_name=filename,
+            conditional=True,
+            etag=True,
+            last_modified=os.path.getmtime(filepath),
+            max_age=3600
         )
     
     except Exception as e:
@@ -169,8 +435,7 @@ def get_campaigns():
         if not os.path.exists(filepath):
             return jsonify({'error': 'File not found'}), 404
         
-        df = pd.read_csv(filepath)
-        processor = DataProcessor(df)
+        processor = _get_processor(filepath, CAMPAIGN_LIST_COLUMNS)
         campaigns = processor.get_campaign_list()
         
         return jsonify({
@@ -183,4 +448,7 @@ def get_campaigns():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
+    # Web entrypoints warm the shared Gemini client (gunicorn in gunicorn.conf.py);
+    # importing app, as the RQ report worker does, opens no connection
+    get_generator().warm_up()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
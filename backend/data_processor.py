@@ -4,196 +4,344 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+# Copy-on-write lets DataProcessor share the caller's columns instead of deep-copying
+# the frame; anything it modifies is copied lazily and the caller's frame is untouched
+pd.set_option('mode.copy_on_write', True)
+
+def _grouped_sum_count(values, codes, n_groups):
+    """Per-group column sums of a (rows, columns) array, plus group sizes"""
+    # One bincount over (group, column) cell indices sums every column in a single pass
+    n_columns = values.shape[1]
+    cells = (codes.astype(np.int64)[:, None] * n_columns + np.arange(n_columns)).ravel()
+    sums = np.bincount(cells, weights=values.ravel(), minlength=n_groups * n_columns)
+    return sums.reshape(n_groups, n_columns), np.bincount(codes, minlength=n_groups)
+
+def _records(frame):
+    """frame.to_dict('records') built from whole-column tolist() calls"""
+    # tolist() boxes each column to Python scalars in C, where to_dict boxes value by value
+    columns = list(frame.columns)
+    return [dict(zip(columns, row)) for row in zip(*(frame[column].tolist() for column in columns))]
+
 class DataProcessor:
     def __init__(self, df):
-        self.df = df.copy()
+        self.df = df.copy(deep=False)
         self.clean_data()
+        
+        # Aggregates shared by several views, computed on first use
+        self._totals = None
+        self._platform_agg = None
+        self._channel_agg = None
+        self._campaign_rows = None
+        self._campaign_summaries = None
+        self._data_summary = None
+        self._cross_analysis = None
+        self._text_agg = {}
     
     def clean_data(self):
         """Clean and prepare data"""
         # Convert time to datetime
         if 'time' in self.df.columns:
-            self.df['time'] = pd.to_datetime(self.df['time'], errors='coerce')
-            self.df['date'] = self.df['time'].dt.date
-            self.df['day_of_week'] = self.df['time'].dt.day_name()
-        
-        # Fill NaN values appropriately
+            # ISO8601 takes the fast parser for both '2022-05-01' and '2022-05-01 10:00:00';
+            # other layouts (e.g. '01/05/2022') come back NaT there, so those are
+            # re-parsed with the format inferred as before
+            raw = self.df['time']
+            parsed = pd.to_datetime(raw, errors='coerce', format='ISO8601', cache=True)
+            if (parsed.isna() & raw.notna()).any():
+                parsed = pd.to_datetime(raw, errors='coerce', cache=True)
+            self.df['time'] = parsed
+            # Day-resolution datetime64 groups far faster than Python date objects
+            self.df['date'] = self.df['time'].values.astype('datetime64[D]')
+        
+        # Fill NaN values appropriately, in one pass over the numeric block
         numeric_columns = self.df.select_dtypes(include=[np.number]).columns
-        for col in numeric_columns:
-            self.df[col].fillna(0, inplace=True)
-        
-        # Calculate derived metrics
-        self.df['ctr'] = np.where(
-            self.df['impressions'] > 0,
-            (self.df['clicks'] / self.df['impressions']) * 100,
-            0
-        )
-        
-        self.df['cpm'] = np.where(
-            self.df['impressions'] > 0,
-            (self.df['media_cost_usd'] / self.df['impressions']) * 1000,
-            0
-        )
-        
-        self.df['cpc'] = np.where(
-            self.df['clicks'] > 0,
-            self.df['media_cost_usd'] / self.df['clicks'],
-            0
-        )
-        
-        # Calculate aspect ratio (only if columns exist)
+        self.df[numeric_columns] = self.df[numeric_columns].fillna(0)
+        
+        # Store counts, ids and creative sizes in the narrowest integer type that holds
+        # them (left as-is if they don't fit or aren't whole); sums still accumulate in
+        # int64. Spend stays float64 so summed totals stay exact to the cent.
+        for col in ['impressions', 'clicks', 'campaign_item_id', 'template_id', 'creative_width', 'creative_height']:
+            if col in self.df.columns:
+                self.df[col] = pd.to_numeric(self.df[col], downcast='integer')
+        
+        # Calculate derived metrics in place on preallocated float32 buffers, reusing the masks
+        impressions = self.df['impressions'].to_numpy()
+        clicks = self.df['clicks'].to_numpy()
+        cost = self.df['media_cost_usd'].to_numpy()
+        has_impressions = impressions > 0
+        has_clicks = clicks > 0
+        
+        ctr = np.zeros(len(self.df), dtype=np.float32)
+        np.divide(clicks, impressions, out=ctr, where=has_impressions)
+        ctr *= 100
+        
+        cpm = np.zeros(len(self.df), dtype=np.float32)
+        np.divide(cost, impressions, out=cpm, where=has_impressions)
+        cpm *= 1000
+        
+        cpc = np.zeros(len(self.df), dtype=np.float32)
+        np.divide(cost, clicks, out=cpc, where=has_clicks)
+        
+        self.df['ctr'] = ctr
+        self.df['cpm'] = cpm
+        self.df['cpc'] = cpc
+        
+        # Calculate aspect ratio (only if columns exist). Kept float64: it is a group
+        # key emitted as-is, where float32 would show up as 1.7777777910232544
         if 'creative_width' in self.df.columns and 'creative_height' in self.df.columns:
-            self.df['aspect_ratio'] = np.where(
-                self.df['creative_height'] > 0,
-                self.df['creative_width'] / self.df['creative_height'],
-                0
-            )
+            height = self.df['creative_height'].to_numpy()
+            aspect_ratio = np.zeros(len(self.df), dtype=np.float64)
+            np.divide(self.df['creative_width'].to_numpy(), height, out=aspect_ratio, where=height > 0)
+            self.df['aspect_ratio'] = aspect_ratio
         else:
             self.df['aspect_ratio'] = 0
         
         # Weekend vs Weekday (only if not already present)
         if 'weekday_cat' not in self.df.columns:
-            if 'day_of_week' in self.df.columns:
-                self.df['weekday_cat'] = self.df['day_of_week'].apply(
-                    lambda x: 'Weekend' if x in ['Saturday', 'Sunday'] else 'Weekday'
-                )
-            elif 'time' in self.df.columns:
-                # If we have time but not day_of_week, create it
-                self.df['weekday_cat'] = self.df['time'].dt.day_name().apply(
-                    lambda x: 'Weekend' if x in ['Saturday', 'Sunday'] else 'Weekday'
-                )
+            if 'time' in self.df.columns:
+                # dayofweek runs Monday=0 .. Sunday=6
+                dow = self.df['time'].dt.dayofweek.to_numpy()
+                self.df['weekday_cat'] = np.where(dow >= 5, 'Weekend', 'Weekday')
             else:
                 self.df['weekday_cat'] = 'Unknown'
+        
+        # Repeated groupby/filter keys become categoricals so they group on integer codes
+        for col in ['weekday_cat', 'channel_name', 'ext_service_name', 'campaign_item_id']:
+            if col in self.df.columns:
+                self.df[col] = self.df[col].astype('category')
+        
+        # One contiguous 1-D array per metric column, in its stored dtype, for the
+        # reductions that bypass pandas
+        self._metric_arrays = {
+            col: np.ascontiguousarray(self.df[col].to_numpy())
+            for col in ['impressions', 'clicks', 'media_cost_usd', 'ctr', 'cpm', 'cpc', 'total_reach', 'unique_reach']
+            if col in self.df.columns
+        }
+    
+    def _get_totals(self):
+        """Frame-wide totals, computed in one pass and reused by every summary"""
+        if self._totals is None:
+            metrics = self._metric_arrays
+            campaign_ids, campaign_count = self._distinct(self.df['campaign_item_id'])
+            self._totals = {
+                'impressions': int(metrics['impressions'].sum(dtype=np.int64)),
+                'clicks': int(metrics['clicks'].sum(dtype=np.int64)),
+                'spend': float(metrics['media_cost_usd'].sum()),
+                'campaigns': campaign_count,
+                'campaign_ids': campaign_ids
+            }
+        return self._totals
+    
+    def _distinct(self, series):
+        """Distinct values of a series and their non-null count, from a single unique() pass"""
+        values = series.unique()
+        return values.tolist(), int(len(values) - pd.isna(values).sum())
     
     def get_data_summary(self):
         """Get high-level data summary"""
-        summary = {
-            'total_rows': len(self.df),
-            'date_range': {
-                'start': str(self.df['time'].min()) if 'time' in self.df.columns else 'N/A',
-                'end': str(self.df['time'].max()) if 'time' in self.df.columns else 'N/A'
-            },
-            'campaigns': {
-                'total': int(self.df['campaign_item_id'].nunique()),
-                'list': self.df['campaign_item_id'].unique().tolist()
-            },
-            'platforms': {
-                'total': int(self.df['ext_service_name'].nunique()),
-                'list': self.df['ext_service_name'].unique().tolist()
-            },
-            'channels': {
-                'total': int(self.df['channel_name'].nunique()),
-                'list': self.df['channel_name'].unique().tolist()
-            },
-            'total_spend': float(self.df['media_cost_usd'].sum()),
-            'total_impressions': int(self.df['impressions'].sum()),
-            'total_clicks': int(self.df['clicks'].sum()),
-            'overall_ctr': float((self.df['clicks'].sum() / self.df['impressions'].sum() * 100) if self.df['impressions'].sum() > 0 else 0)
-        }
-        return summary
+        if self._data_summary is None:
+            totals = self._get_totals()
+            platforms, platform_count = self._distinct(self.df['ext_service_name'])
+            channels, channel_count = self._distinct(self.df['channel_name'])
+            self._data_summary = {
+                'total_rows': len(self.df),
+                'date_range': {
+                    'start': str(self.df['time'].min()) if 'time' in self.df.columns else 'N/A',
+                    'end': str(self.df['time'].max()) if 'time' in self.df.columns else 'N/A'
+                },
+                'campaigns': {
+                    'total': totals['campaigns'],
+                    'list': totals['campaign_ids']
+                },
+                'platforms': {
+                    'total': platform_count,
+                    'list': platforms
+                },
+                'channels': {
+                    'total': channel_count,
+                    'list': channels
+                },
+                'total_spend': totals['spend'],
+                'total_impressions': totals['impressions'],
+                'total_clicks': totals['clicks'],
+                'overall_ctr': float((totals['clicks'] / totals['impressions'] * 100) if totals['impressions'] > 0 else 0)
+            }
+        return self._data_summary
     
     def get_campaign_list(self):
         """Get list of campaigns with basic metrics"""
+        # One grouped pass over the frame instead of a boolean mask per campaign
+        grouped = self.df.groupby('campaign_item_id', observed=True, sort=False)
+        aggregations = {
+            'impressions': ('impressions', 'sum'),
+            'clicks': ('clicks', 'sum'),
+            'spend': ('media_cost_usd', 'sum'),
+            'ctr': ('ctr', 'mean')
+        }
+        if 'date' in self.df.columns:
+            aggregations['days'] = ('date', 'nunique')
+        metrics = grouped.agg(**aggregations)
+        platforms = grouped['ext_service_name'].unique()
+        
         campaigns = []
-        for campaign_id in self.df['campaign_item_id'].unique():
-            campaign_data = self.df[self.df['campaign_item_id'] == campaign_id]
-            
+        for row in metrics.itertuples():
             campaigns.append({
-                'id': int(campaign_id),
-                'impressions': int(campaign_data['impressions'].sum()),
-                'clicks': int(campaign_data['clicks'].sum()),
-                'spend': float(campaign_data['media_cost_usd'].sum()),
-                'ctr': float(campaign_data['ctr'].mean()),
-                'days': int(campaign_data['date'].nunique()) if 'date' in campaign_data.columns else 0,
-                'platforms': campaign_data['ext_service_name'].unique().tolist()
+                'id': int(row.Index),
+                'impressions': int(row.impressions),
+                'clicks': int(row.clicks),
+                'spend': float(row.spend),
+                'ctr': float(row.ctr),
+                'days': int(row.days) if 'days' in metrics.columns else 0,
+                'platforms': list(platforms[row.Index])
             })
         
         return sorted(campaigns, key=lambda x: x['spend'], reverse=True)
     
+    def get_top_campaigns(self, n):
+        """Ids of the n campaigns with the highest total spend"""
+        # Ranked from the grouped campaign summaries the campaign pages use anyway
+        spend = pd.Series({
+            campaign_id: summary['total_spend']
+            for campaign_id, summary in self._get_campaign_summaries().items()
+        }, dtype=float)
+        return spend.nlargest(n).index.tolist()
+    
     def get_campaign_analysis(self, campaign_id):
         """Get detailed analysis for a single campaign"""
-        campaign_data = self.df[self.df['campaign_item_id'] == campaign_id]
+        rows = self._get_campaign_rows().get(campaign_id)
         
-        if len(campaign_data) == 0:
+        if rows is None:
             return None
         
+        return self._build_campaign_analysis(campaign_id, rows)
+    
+    def get_all_campaign_analyses(self, campaign_ids=None):
+        """Get detailed analyses keyed by campaign id, for every campaign or only campaign_ids"""
+        positions = self._get_campaign_rows()
+        if campaign_ids is None:
+            campaign_ids = positions.keys()
+        
+        return {
+            campaign_id: self._build_campaign_analysis(campaign_id, positions[campaign_id])
+            for campaign_id in campaign_ids
+            if campaign_id in positions
+        }
+    
+    def _get_campaign_rows(self):
+        """Row positions of every campaign, keyed by id, from one hash partition of the frame"""
+        # Reused by every campaign lookup instead of a full-frame comparison per campaign
+        if self._campaign_rows is None:
+            self._campaign_rows = self.df.groupby('campaign_item_id', observed=True, sort=False).indices
+        return self._campaign_rows
+    
+    def _build_campaign_analysis(self, campaign_id, rows):
+        """Build a campaign's analysis from its row positions"""
+        campaign_data = self.df.iloc[rows]
+        
         analysis = {
             'campaign_id': int(campaign_id),
-            'summary': self._get_campaign_summary(campaign_data),
+            'summary': self._get_campaign_summary(campaign_id),
             'trends': self._get_campaign_trends(campaign_data),
             'channels': self._get_channel_analysis(campaign_data),
             'creatives': self._get_creative_analysis(campaign_data),
-            'keywords': self._get_keyword_analysis(campaign_data),
+            'keywords': self._get_keyword_analysis(campaign_data, ('campaign_item_id', campaign_id)),
             'landing_pages': self._get_landing_page_analysis(campaign_data),
             'platforms': self._get_platform_breakdown(campaign_data)
         }
         
         return analysis
     
-    def _get_campaign_summary(self, data):
+    def _get_campaign_summary(self, campaign_id):
         """Get campaign summary metrics"""
-        summary = {
-            'total_impressions': int(data['impressions'].sum()),
-            'total_clicks': int(data['clicks'].sum()),
-            'total_spend': float(data['media_cost_usd'].sum()),
-            'avg_ctr': float(data['ctr'].mean()),
-            'avg_cpm': float(data['cpm'].mean()),
-            'avg_cpc': float(data['cpc'].mean()),
-            'total_reach': int(data['total_reach'].sum()) if 'total_reach' in data.columns else 0,
-            'unique_reach': int(data['unique_reach'].sum()) if 'unique_reach' in data.columns else 0,
-            'days_running': int(data['date'].nunique()) if 'date' in data.columns else 0,
-            'platforms': data['ext_service_name'].unique().tolist(),
-            'channels': data['channel_name'].unique().tolist(),
-            'budget': float(data['campaign_budget_usd'].max()) if 'campaign_budget_usd' in data.columns else 0
-        }
-        return summary
+        return dict(self._get_campaign_summaries()[campaign_id])
+    
+    def _get_campaign_summaries(self):
+        """Summary metrics for every campaign, keyed by id and computed in one grouped pass"""
+        if self._campaign_summaries is None:
+            spec = {
+                'impressions': 'sum',
+                'clicks': 'sum',
+                'media_cost_usd': 'sum',
+                'ctr': 'mean',
+                'cpm': 'mean',
+                'cpc': 'mean'
+            }
+            for col in ['total_reach', 'unique_reach']:
+                if col in self.df.columns:
+                    spec[col] = 'sum'
+            metrics = self._aggregate(self.df, 'campaign_item_id', spec)
+            
+            grouped = self.df.groupby('campaign_item_id', observed=True, sort=False)
+            platforms = grouped['ext_service_name'].unique().to_dict()
+            channels = grouped['channel_name'].unique().to_dict()
+            days_running = grouped['date'].nunique().to_dict() if 'date' in self.df.columns else {}
+            budgets = grouped['campaign_budget_usd'].max().to_dict() if 'campaign_budget_usd' in self.df.columns else {}
+            
+            self._campaign_summaries = {}
+            for row in _records(metrics):
+                campaign_id = row['campaign_item_id']
+                self._campaign_summaries[campaign_id] = {
+                    'total_impressions': int(row['impressions']),
+                    'total_clicks': int(row['clicks']),
+                    'total_spend': float(row['media_cost_usd']),
+                    'avg_ctr': float(row['ctr']),
+                    'avg_cpm': float(row['cpm']),
+                    'avg_cpc': float(row['cpc']),
+                    'total_reach': int(row.get('total_reach', 0)),
+                    'unique_reach': int(row.get('unique_reach', 0)),
+                    'days_running': int(days_running.get(campaign_id, 0)),
+                    'platforms': platforms[campaign_id].tolist(),
+                    'channels': channels[campaign_id].tolist(),
+                    'budget': float(budgets.get(campaign_id, 0))
+                }
+        return self._campaign_summaries
     
     def _get_campaign_trends(self, data):
         """Get daily trends for campaign"""
         if 'date' not in data.columns:
             return {}
         
-        daily = data.groupby('date').agg({
+        daily = self._aggregate(data, 'date', {
             'impressions': 'sum',
             'clicks': 'sum',
             'media_cost_usd': 'sum',
             'ctr': 'mean',
             'cpm': 'mean',
             'cpc': 'mean'
-        }).reset_index()
+        })
         
         daily['date'] = daily['date'].astype(str)
         
         # Weekend vs Weekday
-        weekday_data = data.groupby('weekday_cat').agg({
+        weekday_data = self._aggregate(data, 'weekday_cat', {
             'impressions': 'sum',
             'clicks': 'sum',
             'ctr': 'mean',
             'media_cost_usd': 'sum'
-        }).reset_index()
+        })
         
         return {
-            'daily': daily.to_dict('records'),
-            'weekday_performance': weekday_data.to_dict('records')
+            'daily': _records(daily),
+            'weekday_performance': _records(weekday_data)
         }
     
     def _get_channel_analysis(self, data):
         """Get channel-level analysis"""
-        channels = data.groupby('channel_name').agg({
+        channels = self._aggregate(data, 'channel_name', {
             'impressions': 'sum',
             'clicks': 'sum',
             'media_cost_usd': 'sum',
             'ctr': 'mean',
             'cpm': 'mean',
             'cpc': 'mean'
-        }).reset_index()
+        })
         
         channels = channels.sort_values('media_cost_usd', ascending=False)
         
         return {
-            'by_channel': channels.to_dict('records'),
-            'best_performing': channels.nlargest(1, 'ctr').to_dict('records')[0] if len(channels) > 0 else {},
-            'most_expensive': channels.nlargest(1, 'media_cost_usd').to_dict('records')[0] if len(channels) > 0 else {}
+            'by_channel': _records(channels),
+            **self._ctr_extremes(channels, 'channel'),
+            'best_performing': self._top_row(channels, 'ctr'),
+            'most_expensive': self._top_row(channels, 'media_cost_usd')
         }
     
     def _get_creative_analysis(self, data):
@@ -206,65 +354,44 @@ class DataProcessor:
                 'templates': []
             }
         
-        creatives = data.groupby(['creative_width', 'creative_height', 'aspect_ratio']).agg({
+        creatives = self._aggregate(data, ['creative_width', 'creative_height', 'aspect_ratio'], {
             'impressions': 'sum',
             'clicks': 'sum',
             'ctr': 'mean',
             'media_cost_usd': 'sum'
-        }).reset_index()
+        })
         
         creatives = creatives.sort_values('ctr', ascending=False)
         
         # Template analysis
         if 'template_id' in data.columns:
-            templates = data.groupby('template_id').agg({
+            templates = self._aggregate(data, 'template_id', {
                 'impressions': 'sum',
                 'clicks': 'sum',
                 'ctr': 'mean'
-            }).reset_index()
+            })
             templates = templates.sort_values('ctr', ascending=False)
-            template_data = templates.to_dict('records')
+            template_data = _records(templates)
         else:
             template_data = []
         
         return {
-            'by_size': creatives.to_dict('records'),
-            'best_performing_size': creatives.nlargest(1, 'ctr').to_dict('records')[0] if len(creatives) > 0 else {},
+            'by_size': _records(creatives),
+            'best_performing_size': self._top_row(creatives, 'ctr'),
             'templates': template_data
         }
     
-    def _get_keyword_analysis(self, data):
-        """Get keyword performance analysis"""
+    def _get_keyword_analysis(self, data, by=None):
+        """Get keyword performance analysis; by=(column, value) names the slice data is"""
         if 'keywords' not in data.columns or data['keywords'].isna().all():
             return {'keywords': [], 'search_tags': []}
         
         # Keywords analysis
-        keyword_data = data[data['keywords'].notna()].copy()
-        if len(keyword_data) > 0:
-            keywords = keyword_data.groupby('keywords').agg({
-                'impressions': 'sum',
-                'clicks': 'sum',
-                'ctr': 'mean',
-                'media_cost_usd': 'sum'
-            }).reset_index()
-            keywords = keywords.sort_values('ctr', ascending=False)
-            keyword_list = keywords.head(10).to_dict('records')
-        else:
-            keyword_list = []
+        keyword_list = self._top_text_values('keywords', ['impressions', 'clicks', 'ctr', 'media_cost_usd'], by)
         
         # Search tags analysis
         if 'search_tags' in data.columns:
-            tag_data = data[data['search_tags'].notna()].copy()
-            if len(tag_data) > 0:
-                tags = tag_data.groupby('search_tags').agg({
-                    'impressions': 'sum',
-                    'clicks': 'sum',
-                    'ctr': 'mean'
-                }).reset_index()
-                tags = tags.sort_values('ctr', ascending=False)
-                tag_list = tags.head(10).to_dict('records')
-            else:
-                tag_list = []
+            tag_list = self._top_text_values('search_tags', ['impressions', 'clicks', 'ctr'], by)
         else:
             tag_list = []
         
@@ -273,35 +400,64 @@ class DataProcessor:
             'search_tags': tag_list
         }
     
+    def _get_text_aggregates(self, column):
+        """Sums per (campaign, platform, value) of a text column, computed once for every slice"""
+        if column not in self._text_agg:
+            rows = self.df[self.df[column].notna()]
+            # CTR is carried as a float64 sum and row count so slices can re-derive the mean
+            self._text_agg[column] = rows.assign(ctr=rows['ctr'].astype(np.float64)).groupby(
+                ['campaign_item_id', 'ext_service_name', column], observed=True
+            ).agg(
+                impressions=('impressions', 'sum'),
+                clicks=('clicks', 'sum'),
+                ctr_sum=('ctr', 'sum'),
+                rows=('ctr', 'size'),
+                media_cost_usd=('media_cost_usd', 'sum')
+            ).reset_index()
+        return self._text_agg[column]
+    
+    def _top_text_values(self, column, metrics, by=None):
+        """Top 10 values of a text column by mean CTR, over all data or the by=(column, value) slice"""
+        aggregates = self._get_text_aggregates(column)
+        if by is not None:
+            aggregates = aggregates[aggregates[by[0]] == by[1]]
+        if len(aggregates) == 0:
+            return []
+        
+        table = aggregates.groupby(column)[['impressions', 'clicks', 'ctr_sum', 'rows', 'media_cost_usd']].sum()
+        table['ctr'] = table['ctr_sum'] / table['rows']
+        table = table.reset_index()[[column, *metrics]]
+        return _records(table.sort_values('ctr', ascending=False).head(10))
+    
     def _get_landing_page_analysis(self, data):
         """Get landing page performance analysis"""
         if 'landing_page' not in data.columns or data['landing_page'].isna().all():
             return {'pages': []}
         
-        pages = data[data['landing_page'].notna()].groupby('landing_page').agg({
+        pages = self._aggregate(data[data['landing_page'].notna()], 'landing_page', {
             'impressions': 'sum',
             'clicks': 'sum',
             'ctr': 'mean',
             'media_cost_usd': 'sum'
-        }).reset_index()
+        })
         
         pages = pages.sort_values('ctr', ascending=False)
         
         return {
-            'pages': pages.to_dict('records'),
-            'best_performing': pages.nlargest(1, 'ctr').to_dict('records')[0] if len(pages) > 0 else {}
+            'pages': _records(pages),
+            'best_performing': self._top_row(pages, 'ctr')
         }
     
     def _get_platform_breakdown(self, data):
         """Get platform-wise breakdown for campaign"""
-        platforms = data.groupby('ext_service_name').agg({
+        platforms = self._aggregate(data, 'ext_service_name', {
             'impressions': 'sum',
             'clicks': 'sum',
             'media_cost_usd': 'sum',
             'ctr': 'mean',
             'cpm': 'mean',
             'cpc': 'mean'
-        }).reset_index()
+        })
         
         # Calculate percentage contribution
         total_spend = platforms['media_cost_usd'].sum()
@@ -310,28 +466,31 @@ class DataProcessor:
         else:
             platforms['spend_percentage'] = 0
         
-        return platforms.to_dict('records')
+        return _records(platforms)
     
     def get_platform_analysis(self):
         """Get platform-level analysis across all campaigns"""
-        platforms = {}
+        # Partition once; the summaries come from the shared per-platform aggregates
+        grouped = self.df.groupby('ext_service_name', observed=True, sort=False)
+        summaries = self._get_platform_aggregates().to_dict('index')
         
-        for platform in self.df['ext_service_name'].unique():
-            platform_data = self.df[self.df['ext_service_name'] == platform]
+        platforms = {}
+        for platform, platform_data in grouped:
+            summary = summaries[platform]
             
             platforms[platform] = {
                 'summary': {
-                    'total_impressions': int(platform_data['impressions'].sum()),
-                    'total_clicks': int(platform_data['clicks'].sum()),
-                    'total_spend': float(platform_data['media_cost_usd'].sum()),
-                    'total_reach': int(platform_data['total_reach'].sum()) if 'total_reach' in platform_data.columns else 0,
-                    'avg_ctr': float(platform_data['ctr'].mean()),
-                    'avg_cpm': float(platform_data['cpm'].mean()),
-                    'avg_cpc': float(platform_data['cpc'].mean()),
-                    'campaigns_count': int(platform_data['campaign_item_id'].nunique())
+                    'total_impressions': int(summary['impressions']),
+                    'total_clicks': int(summary['clicks']),
+                    'total_spend': float(summary['media_cost_usd']),
+                    'total_reach': int(summary.get('total_reach', 0)),
+                    'avg_ctr': float(summary['ctr']),
+                    'avg_cpm': float(summary['cpm']),
+                    'avg_cpc': float(summary['cpc']),
+                    'campaigns_count': int(summary['campaigns_count'])
                 },
                 'trends': self._get_platform_trends(platform_data),
-                'keywords': self._get_keyword_analysis(platform_data),
+                'keywords': self._get_keyword_analysis(platform_data, ('ext_service_name', platform)),
                 'channels': self._get_channel_analysis(platform_data)
             }
         
@@ -342,93 +501,149 @@ class DataProcessor:
         if 'date' not in data.columns:
             return {}
         
-        daily = data.groupby('date').agg({
+        daily = self._aggregate(data, 'date', {
             'impressions': 'sum',
             'clicks': 'sum',
             'media_cost_usd': 'sum',
             'ctr': 'mean',
             'cpm': 'mean',
             'cpc': 'mean'
-        }).reset_index()
+        })
         
         daily['date'] = daily['date'].astype(str)
         
-        return daily.to_dict('records')
+        return _records(daily)
     
     def get_cross_cutting_analysis(self):
         """Get cross-cutting insights across all data"""
-        analysis = {
-            'overall_metrics': {
-                'total_campaigns': int(self.df['campaign_item_id'].nunique()),
-                'total_spend': float(self.df['media_cost_usd'].sum()),
-                'total_impressions': int(self.df['impressions'].sum()),
-                'total_clicks': int(self.df['clicks'].sum()),
-                'overall_ctr': float((self.df['clicks'].sum() / self.df['impressions'].sum() * 100) if self.df['impressions'].sum() > 0 else 0),
-                'overall_cpm': float((self.df['media_cost_usd'].sum() / self.df['impressions'].sum() * 1000) if self.df['impressions'].sum() > 0 else 0),
-                'overall_cpc': float(self.df['media_cost_usd'].sum() / self.df['clicks'].sum()) if self.df['clicks'].sum() > 0 else 0
-            },
-            'platform_comparison': self._get_platform_comparison(),
-            'channel_comparison': self._get_channel_comparison(),
-            'top_keywords': self._get_top_keywords_overall(),
-            'date_range': {
-                'start': str(self.df['time'].min()) if 'time' in self.df.columns else 'N/A',
-                'end': str(self.df['time'].max()) if 'time' in self.df.columns else 'N/A',
-                'total_days': int(self.df['date'].nunique()) if 'date' in self.df.columns else 0
+        # Memoized: the report and the API ask for it several times per processor
+        if self._cross_analysis is None:
+            totals = self._get_totals()
+            platforms = self._get_platform_comparison()
+            channels = self._get_channel_comparison()
+            self._cross_analysis = {
+                'overall_metrics': {
+                    'total_campaigns': totals['campaigns'],
+                    'total_spend': totals['spend'],
+                    'total_impressions': totals['impressions'],
+                    'total_clicks': totals['clicks'],
+                    'overall_ctr': float((totals['clicks'] / totals['impressions'] * 100) if totals['impressions'] > 0 else 0),
+                    'overall_cpm': float((totals['spend'] / totals['impressions'] * 1000) if totals['impressions'] > 0 else 0),
+                    'overall_cpc': float(totals['spend'] / totals['clicks']) if totals['clicks'] > 0 else 0
+                },
+                'platform_comparison': _records(platforms),
+                'channel_comparison': _records(channels),
+                **self._ctr_extremes(platforms, 'platform'),
+                **self._ctr_extremes(channels, 'channel'),
+                'top_keywords': self._get_top_keywords_overall(),
+                'date_range': {
+                    'start': str(self.df['time'].min()) if 'time' in self.df.columns else 'N/A',
+                    'end': str(self.df['time'].max()) if 'time' in self.df.columns else 'N/A',
+                    'total_days': int(self.df['date'].nunique()) if 'date' in self.df.columns else 0
+                }
             }
-        }
         
-        return analysis
+        return self._cross_analysis
+    
+    def _get_platform_aggregates(self):
+        """Per-platform sums and means, indexed by platform and shared by the platform views"""
+        if self._platform_agg is None:
+            spec = {
+                'impressions': 'sum',
+                'clicks': 'sum',
+                'media_cost_usd': 'sum',
+                'ctr': 'mean',
+                'cpm': 'mean',
+                'cpc': 'mean'
+            }
+            if 'total_reach' in self.df.columns:
+                spec['total_reach'] = 'sum'
+            platforms = self._aggregate(self.df, 'ext_service_name', spec).set_index('ext_service_name')
+            campaigns_count = self.df.groupby('ext_service_name', observed=True)['campaign_item_id'].nunique()
+            platforms.insert(6, 'campaigns_count', campaigns_count.reindex(platforms.index).to_numpy())
+            self._platform_agg = platforms
+        return self._platform_agg
     
     def _get_platform_comparison(self):
         """Compare platforms"""
-        platforms = self.df.groupby('ext_service_name').agg({
-            'impressions': 'sum',
-            'clicks': 'sum',
-            'media_cost_usd': 'sum',
-            'ctr': 'mean',
-            'cpm': 'mean',
-            'cpc': 'mean',
-            'campaign_item_id': 'nunique'
-        }).reset_index()
-        
-        platforms.rename(columns={'campaign_item_id': 'campaigns_count'}, inplace=True)
-        
-        return platforms.to_dict('records')
+        platforms = self._get_platform_aggregates().drop(columns='total_reach', errors='ignore')
+        return platforms.reset_index()
     
     def _get_channel_comparison(self):
         """Compare channels across all data"""
-        channels = self.df.groupby('channel_name').agg({
-            'impressions': 'sum',
-            'clicks': 'sum',
-            'media_cost_usd': 'sum',
-            'ctr': 'mean',
-            'cpm': 'mean',
-            'cpc': 'mean'
-        }).reset_index()
-        
-        channels = channels.sort_values('media_cost_usd', ascending=False)
+        if self._channel_agg is None:
+            channels = self._aggregate(self.df, 'channel_name', {
+                'impressions': 'sum',
+                'clicks': 'sum',
+                'media_cost_usd': 'sum',
+                'ctr': 'mean',
+                'cpm': 'mean',
+                'cpc': 'mean'
+            })
+            
+            self._channel_agg = channels.sort_values('media_cost_usd', ascending=False)
         
-        return channels.to_dict('records')
+        return self._channel_agg
+    
+    def _aggregate(self, data, key, spec):
+        """Grouped sums/means for an analysis table, with the group keys as columns"""
+        if isinstance(key, str) and isinstance(data[key].dtype, pd.CategoricalDtype):
+            return self._bincount_aggregate(data, key, spec)
+        
+        # One block reduction per function (e.g. all sums at once) rather than
+        # dispatching every column separately as a dict .agg() does
+        grouped = data.groupby(key, observed=True)
+        columns_by_func = {}
+        for column, func in spec.items():
+            columns_by_func.setdefault(func, []).append(column)
+        parts = [getattr(grouped[columns], func)() for func, columns in columns_by_func.items()]
+        return pd.concat(parts, axis=1)[list(spec)].reset_index()
+    
+    def _bincount_aggregate(self, data, key, spec):
+        """_aggregate for a categorical key, as np.bincount sums over its integer codes"""
+        dtype = data[key].dtype
+        codes = data[key].cat.codes.to_numpy()
+        present = codes >= 0  # code -1 is a missing key, which groupby drops
+        if not present.all():
+            codes = codes[present]
+        
+        columns = list(spec)
+        values = np.column_stack([data[column].to_numpy(dtype=np.float64) for column in columns])
+        if not present.all():
+            values = values[present]
+        sums, counts = _grouped_sum_count(values, codes, len(dtype.categories))
+        
+        observed = np.flatnonzero(counts)
+        sums = sums[observed]
+        table = {key: pd.Categorical.from_codes(observed, dtype=dtype)}
+        for j, column in enumerate(columns):
+            if spec[column] == 'mean':
+                table[column] = sums[:, j] / counts[observed]
+            elif np.issubdtype(data[column].dtype, np.integer):
+                table[column] = sums[:, j].astype(np.int64)  # float64 sums are exact below 2**53
+            else:
+                table[column] = sums[:, j]
+        return pd.DataFrame(table)
+    
+    def _top_row(self, frame, column):
+        """Record of the row with the largest value in column, or {} for an empty frame"""
+        if len(frame) == 0:
+            return {}
+        return _records(frame.iloc[[int(frame[column].to_numpy().argmax())]])[0]
+    
+    def _ctr_extremes(self, frame, name):
+        """Row positions of the best and worst CTR in an aggregated frame"""
+        if len(frame) == 0:
+            return {f'best_{name}_idx': None, f'worst_{name}_idx': None}
+        ctr = frame['ctr'].to_numpy()
+        return {f'best_{name}_idx': int(ctr.argmax()), f'worst_{name}_idx': int(ctr.argmin())}
     
     def _get_top_keywords_overall(self):
         """Get top performing keywords across all campaigns"""
         if 'keywords' not in self.df.columns or self.df['keywords'].isna().all():
             return []
         
-        keyword_data = self.df[self.df['keywords'].notna()].copy()
-        if len(keyword_data) == 0:
-            return []
-        
-        keywords = keyword_data.groupby('keywords').agg({
-            'impressions': 'sum',
-            'clicks': 'sum',
-            'ctr': 'mean',
-            'media_cost_usd': 'sum'
-        }).reset_index()
-        
-        keywords = keywords.sort_values('ctr', ascending=False)
-        
-        return keywords.head(10).to_dict('records')
+        return self._top_text_values('keywords', ['impressions', 'clicks', 'ctr', 'media_cost_usd'])
     
     def get_full_analysis(self):
         """Get complete analysis of all data"""
@@ -0,0 +1,9 @@
+"""
+gunicorn settings for the API server (Procfile and start.sh run gunicorn from backend/)
+"""
+
+
+def post_worker_init(worker):
+    """Build the worker's shared Gemini client and open its connection before it serves requests"""
+    from ai_insights import get_generator
+    get_generator().warm_up()
@@ -1,33 +1,193 @@
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Flowable, KeepTogether
+from reportlab.lib.utils import ImageReader
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.piecharts import Pie
 from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor
+import contextlib
+import diskcache
+import hashlib
+import io
 import os
+import pickle
+import threading
 from data_processor import DataProcessor
-from ai_insights import AIInsightsGenerator
+from ai_insights import get_generator
 import pandas as pd
 import numpy as np
 
+# Fewer rows than this cannot produce meaningful trends or insights
+MIN_ROWS = 10
+
+# Rendered trend chart PNGs, keyed by their input data and reused across report runs
+CHART_CACHE_DIR = os.environ.get('CHART_CACHE_DIR', './.chart_cache')
+# Part of every chart cache key; bump it whenever the chart rendering changes
+_CHART_CACHE_VERSION = 1
+_CHART_CACHE = None
+
+# Series colours for the vector charts, matching the matplotlib palette
+CHART_COLORS = [colors.HexColor(code) for code in ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6']]
+
+# Text and table colours, parsed once for every style that uses them
+COLOR_TITLE = colors.HexColor('#1a1a1a')
+COLOR_HEADING = colors.HexColor('#2c3e50')
+COLOR_SUBHEADING = colors.HexColor('#34495e')
+COLOR_INSIGHT_BACKGROUND = colors.HexColor('#ecf0f1')
+COLOR_TABLE_HEADER = colors.HexColor('#3498db')
+
+def _set_chart_style():
+    """Import matplotlib and apply the report's chart style; also run in each chart worker process"""
+    # Imported here so loading this module (e.g. for the API routes) skips matplotlib and seaborn
+    import matplotlib
+    matplotlib.use('Agg')
+    import seaborn as sns
+    sns.set_style('whitegrid')
+    matplotlib.rcParams['figure.figsize'] = (10, 6)
+    matplotlib.rcParams['font.size'] = 10
+
+# One Figure per thread, cleared between charts instead of built and torn down each time
+_FIGURES = threading.local()
+
+def _chart_figure(width, height):
+    """This thread's reusable chart Figure, cleared and sized for the next chart"""
+    import matplotlib
+    from matplotlib.figure import Figure
+    figure = getattr(_FIGURES, 'figure', None)
+    if figure is None:
+        figure = _FIGURES.figure = Figure()
+    figure.clear()
+    # clear() keeps the margins the last tight_layout() set; start each chart from the defaults
+    figure.set_layout_engine(None)
+    figure.subplots_adjust(**{
+        side: matplotlib.rcParams[f'figure.subplot.{side}']
+        for side in ['left', 'bottom', 'right', 'top', 'wspace', 'hspace']
+    })
+    figure.set_size_inches(width, height)
+    return figure
+
+def _save_png(figure):
+    """Render a chart Figure to PNG bytes"""
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', dpi=100)
+    return buffer.getvalue()
+
+def _chart_cache():
+    """This process's handle on the on-disk chart cache"""
+    global _CHART_CACHE
+    if _CHART_CACHE is None:
+        _CHART_CACHE = diskcache.Cache(CHART_CACHE_DIR, size_limit=256 * 1024 * 1024)
+    return _CHART_CACHE
+
+def _cached_chart(kind, render, *args):
+    """PNG bytes of render(*args), served from the chart cache when the same inputs were drawn before"""
+    digest = hashlib.blake2b(pickle.dumps((_CHART_CACHE_VERSION, args)), digest_size=8).hexdigest()
+    key = f"{kind}_{digest}"
+    
+    cache = _chart_cache()
+    png = cache.get(key)
+    if png is None:
+        png = render(*args)
+        if png is not None:
+            cache.set(key, png)
+    return png
+
+def _render_campaign_assets(trends):
+    """Render one campaign's trend chart, returning its PNG bytes (or None)"""
+    if not (trends and trends.get('daily')):
+        return None
+    return _cached_chart('campaign', _create_campaign_trends_chart, trends)
+
+def _render_platform_assets(platform_name, trends_data):
+    """Render one platform's trend chart, returning its PNG bytes (or None)"""
+    return _cached_chart('platform', _create_platform_trends_chart, platform_name, trends_data)
+
+def _plot_trends(axes, df, panels):
+    """Plot one (column, title, y label, colour) panel per axis against the daily dates"""
+    for ax, (column, title, ylabel, color) in zip(axes, panels):
+        ax.plot(df['date'], df[column], marker='o', color=color, linewidth=2)
+        ax.set_title(title)
+        ax.set_ylabel(ylabel)
+        ax.grid(True, alpha=0.3)
+
+def _create_campaign_trends_chart(trends):
+    """Create campaign trends chart"""
+    if not trends.get('daily'):
+        return None
+    
+    df = pd.DataFrame(trends['daily'])
+    if len(df) == 0:
+        return None
+    
+    # Shared x axis: the date ticks are located once and only the bottom row is labelled
+    fig = _chart_figure(12, 8)
+    axes = fig.subplots(2, 2, sharex=True)
+    _plot_trends(axes.flat, df, [
+        ('ctr', 'Daily CTR', 'CTR (%)', '#3498db'),
+        ('media_cost_usd', 'Daily Spend', 'Spend ($)', '#e74c3c'),
+        ('impressions', 'Daily Impressions', 'Impressions', '#2ecc71'),
+        ('clicks', 'Daily Clicks', 'Clicks', '#f39c12')
+    ])
+    fig.autofmt_xdate(rotation=45)
+    
+    fig.tight_layout()
+    
+    return _save_png(fig)
+
+def _create_platform_trends_chart(platform_name, trends_data):
+    """Create platform trends chart"""
+    if not trends_data:
+        return None
+    
+    df = pd.DataFrame(trends_data)
+    if len(df) == 0:
+        return None
+    
+    fig = _chart_figure(10, 6)
+    axes = fig.subplots(2, 1, sharex=True)
+    _plot_trends(axes, df, [
+        ('ctr', f'{platform_name} - CTR Trend', 'CTR (%)', '#3498db'),
+        ('media_cost_usd', f'{platform_name} - Spend Trend', 'Spend ($)', '#e74c3c')
+    ])
+    fig.autofmt_xdate(rotation=45)
+    
+    fig.tight_layout()
+    
+    return _save_png(fig)
+
+class _DeferredImage(Flowable):
+    """Fixed-size image whose PNG bytes come from a future, awaited only when the page is drawn"""
+    
+    def __init__(self, future, width, height):
+        super().__init__()
+        self.future = future
+        self.width = width
+        self.height = height
+        self.hAlign = 'CENTER'
+    
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+    
+    def draw(self):
+        image = ImageReader(io.BytesIO(self.future.result()))
+        self.canv.drawImage(image, 0, 0, self.width, self.height)
+
 class ReportGenerator:
-    def __init__(self, df, output_folder):
+    def __init__(self, df, output_folder, processor=None):
         self.df = df
         self.output_folder = output_folder
-        self.processor = DataProcessor(df)
-        self.ai_generator = AIInsightsGenerator()  # Initialize AI generator
-        self.chart_folder = os.path.join(output_folder, 'charts')
-        os.makedirs(self.chart_folder, exist_ok=True)
+        self.processor = processor or DataProcessor(df)
+        self.ai_generator = get_generator()  # Shared AI generator
+        self._insights = {}
         
-        # Set style
-        sns.set_style('whitegrid')
-        plt.rcParams['figure.figsize'] = (10, 6)
-        plt.rcParams['font.size'] = 10
+        # Table styles are shared by every table they apply to
+        self._table_style = self._get_table_style()
+        self._cover_table_style = self._get_cover_table_style()
     
     def generate_comprehensive_report(self, report_type='comprehensive'):
         """Generate the main comprehensive PDF report"""
@@ -35,41 +195,82 @@ class ReportGenerator:
         filename = f"AdTech_Report_{timestamp}.pdf"
         filepath = os.path.join(self.output_folder, filename)
         
+        # Degenerate uploads skip every chart and AI call
+        if self.df.empty or len(self.df) < MIN_ROWS:
+            return self._generate_empty_report(filepath)
+        
+        # Load matplotlib before the chart pool forks so its workers inherit it
+        _set_chart_style()
+        
         # Create PDF
-        doc = SimpleDocTemplate(filepath, pagesize=letter,
-                               topMargin=0.5*inch, bottomMargin=0.5*inch,
-                               leftMargin=0.5*inch, rightMargin=0.5*inch)
+        doc = self._create_document(filepath)
         
         story = []
         styles = self._get_styles()
         
-        # Cover Page
-        story.extend(self._create_cover_page(styles))
-        story.append(PageBreak())
-        
-        # Executive Summary
-        story.extend(self._create_executive_summary(styles))
-        story.append(PageBreak())
-        
-        # Platform-Level Analysis
-        story.extend(self._create_platform_analysis(styles))
-        story.append(PageBreak())
-        
-        # Campaign-Level Analysis
-        campaigns = self.df['campaign_item_id'].unique()
-        for i, campaign_id in enumerate(campaigns[:20]):  # Limit to 20 campaigns for demo
-            story.extend(self._create_campaign_report(campaign_id, styles))
-            if i < len(campaigns) - 1:
-                story.append(PageBreak())
-        
-        # Cross-Cutting Insights
-        story.extend(self._create_cross_cutting_analysis(styles))
-        
-        # Build PDF
-        doc.build(story)
+        # Collect analyses up front so every AI insight is requested in one batch
+        platforms_analysis = self.processor.get_platform_analysis()
+        all_campaigns = self.processor.get_data_summary()['campaigns']['list']
+        campaigns = self.processor.get_top_campaigns(20)  # Limit to the 20 highest-spend campaigns
+        campaign_analyses = self.processor.get_all_campaign_analyses(campaigns)
+        
+        # Trend charts render in the pool while the AI insights are fetched and the pages
+        # are laid out; each page waits on its chart only when drawn. Platform charts are
+        # submitted first since their pages are drawn first
+        with self._chart_pool(len(platforms_analysis) + len(campaign_analyses)) as executor:
+            platform_charts = self._submit_platform_charts(executor, platforms_analysis)
+            campaign_charts = self._submit_campaign_charts(executor, campaign_analyses)
+            
+            self._insights = self.ai_generator.generate_all_insights(
+                self.processor.get_cross_cutting_analysis(),
+                platforms_analysis,
+                campaign_analyses
+            )
+            
+            # Cover Page, Executive Summary and Platform-Level Analysis; each section is
+            # built whole, page break included, and added to the story in one extend
+            for section in (
+                self._create_cover_page(styles),
+                self._create_executive_summary(styles),
+                self._create_platform_analysis(styles, platforms_analysis, platform_charts)
+            ):
+                section.append(PageBreak())
+                story.extend(section)
+            
+            # Campaign-Level Analysis
+            for i, campaign_id in enumerate(campaigns):
+                section = self._create_campaign_report(
+                    campaign_id, styles, campaign_analyses.get(campaign_id), campaign_charts.get(campaign_id)
+                )
+                if i < len(all_campaigns) - 1:
+                    section.append(PageBreak())
+                story.extend(section)
+            
+            # Cross-Cutting Insights
+            story.extend(self._create_cross_cutting_analysis(styles))
+            
+            # Build PDF
+            doc.build(story)
         
-        # Clean up chart files
-        self._cleanup_charts()
+        return filepath
+    
+    def _create_document(self, filepath):
+        """Create the letter-sized PDF document with the report margins"""
+        return SimpleDocTemplate(filepath, pagesize=letter,
+                                 topMargin=0.5*inch, bottomMargin=0.5*inch,
+                                 leftMargin=0.5*inch, rightMargin=0.5*inch)
+    
+    def _generate_empty_report(self, filepath):
+        """Build a cover-only PDF for uploads with too few rows to analyze"""
+        styles = self._get_styles()
+        story = self._create_cover_page(styles)
+        story.append(Spacer(1, 0.5*inch))
+        story.append(Paragraph(
+            f"Not enough data for a full report: the uploaded file has {len(self.df):,} rows "
+            f"and at least {MIN_ROWS} are needed.",
+            styles['CustomBody']
+        ))
+        self._create_document(filepath).build(story)
         
         return filepath
     
@@ -82,7 +283,7 @@ class ReportGenerator:
             name='CustomTitle',
             parent=styles['Title'],
             fontSize=24,
-            textColor=colors.HexColor('#1a1a1a'),
+            textColor=COLOR_TITLE,
             spaceAfter=30,
             alignment=TA_CENTER
         ))
@@ -92,7 +293,7 @@ class ReportGenerator:
             name='CustomHeading1',
             parent=styles['Heading1'],
             fontSize=18,
-            textColor=colors.HexColor('#2c3e50'),
+            textColor=COLOR_HEADING,
             spaceAfter=12,
             spaceBefore=12
         ))
@@ -101,7 +302,7 @@ class ReportGenerator:
             name='CustomHeading2',
             parent=styles['Heading2'],
             fontSize=14,
-            textColor=colors.HexColor('#34495e'),
+            textColor=COLOR_SUBHEADING,
             spaceAfter=10,
             spaceBefore=10
         ))
@@ -120,8 +321,8 @@ class ReportGenerator:
             name='InsightBox',
             parent=styles['BodyText'],
             fontSize=11,
-            textColor=colors.HexColor('#2c3e50'),
-            backColor=colors.HexColor('#ecf0f1'),
+            textColor=COLOR_HEADING,
+            backColor=COLOR_INSIGHT_BACKGROUND,
             borderPadding=10,
             spaceAfter=12,
             leading=16
@@ -150,13 +351,7 @@ class ReportGenerator:
         ]
         
         table = Table(cover_data, colWidths=[3*inch, 3*inch])
-        table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-        ]))
+        table.setStyle(self._cover_table_style)
         
         story.append(table)
         
@@ -191,29 +386,34 @@ class ReportGenerator:
         ]
         
         table = Table(metrics_data, colWidths=[3*inch, 3*inch])
-        table.setStyle(self._get_table_style())
+        table.setStyle(self._table_style)
         story.append(table)
         
         # Platform comparison chart
         story.append(Spacer(1, 0.3*inch))
         story.append(Paragraph("Platform Performance Comparison", styles['CustomHeading2']))
         
-        chart_path = self._create_platform_comparison_chart(cross_analysis['platform_comparison'])
-        if chart_path:
-            img = Image(chart_path, width=6*inch, height=3.5*inch)
-            story.append(img)
+        chart = self._create_platform_comparison_chart(cross_analysis['platform_comparison'])
+        if chart:
+            story.append(chart)
+        
+        # Strategic recommendations, one numbered line each
+        story.append(Spacer(1, 0.3*inch))
+        recommendations = self._generate_recommendations_insight(cross_analysis)
+        story.append(KeepTogether([
+            Paragraph("Strategic Recommendations", styles['CustomHeading2']),
+            Paragraph(recommendations.strip().replace('\n', '<br/>'), styles['InsightBox'])
+        ]))
         
         return story
     
-    def _create_platform_analysis(self, styles):
+    def _create_platform_analysis(self, styles, platforms_analysis, trend_charts):
         """Create platform-level analysis section"""
         story = []
         
         story.append(Paragraph("Platform-Level Analysis", styles['CustomHeading1']))
         story.append(Spacer(1, 0.2*inch))
         
-        platforms_analysis = self.processor.get_platform_analysis()
-        
         for platform_name, platform_data in platforms_analysis.items():
             story.append(Paragraph(f"Platform: {platform_name}", styles['CustomHeading2']))
             
@@ -231,7 +431,7 @@ class ReportGenerator:
             ]
             
             table = Table(summary_data, colWidths=[3*inch, 3*inch])
-            table.setStyle(self._get_table_style())
+            table.setStyle(self._table_style)
             story.append(table)
             story.append(Spacer(1, 0.2*inch))
             
@@ -241,21 +441,51 @@ class ReportGenerator:
             story.append(Spacer(1, 0.2*inch))
             
             # Trends chart
-            if platform_data['trends']:
-                chart_path = self._create_platform_trends_chart(platform_name, platform_data['trends'])
-                if chart_path:
-                    img = Image(chart_path, width=6*inch, height=3*inch)
-                    story.append(img)
+            if platform_name in trend_charts:
+                img = _DeferredImage(trend_charts[platform_name], width=6*inch, height=3*inch)
+                story.append(img)
             
             story.append(Spacer(1, 0.3*inch))
         
         return story
     
-    def _create_campaign_report(self, campaign_id, styles):
-        """Create detailed report for a single campaign"""
+    def _chart_pool(self, chart_count):
+        """Process pool for the trend charts, or a null context when one process will do"""
+        workers = min(chart_count, os.cpu_count() or 1)
+        if workers <= 1:
+            return contextlib.nullcontext()
+        return ProcessPoolExecutor(max_workers=workers, initializer=_set_chart_style)
+    
+    def _submit_chart(self, executor, render, *args):
+        """Start one chart render in the pool, or run it inline without one; returns a future of its PNG bytes"""
+        if executor is None:
+            future = Future()
+            future.set_result(render(*args))
+            return future
+        return executor.submit(render, *args)
+    
+    def _submit_platform_charts(self, executor, platforms_analysis):
+        """Start every platform's trend chart, returning futures of its PNG bytes keyed by platform name"""
+        return {
+            platform_name: self._submit_chart(
+                executor, _render_platform_assets, platform_name, platform_data['trends']
+            )
+            for platform_name, platform_data in platforms_analysis.items()
+            if platform_data['trends']
+        }
+    
+    def _submit_campaign_charts(self, executor, campaign_analyses):
+        """Start every campaign's trend chart, returning futures of its PNG bytes keyed by campaign id"""
+        # Workers only receive the trend records they plot, not the frame
+        return {
+            campaign_id: self._submit_chart(executor, _render_campaign_assets, analysis['trends'])
+            for campaign_id, analysis in campaign_analyses.items()
+        }
+    
+    def _create_campaign_report(self, campaign_id, styles, analysis, trend_chart=None):
+        """Create detailed report for a single campaign; trend_chart is a future of its trend chart PNG"""
         story = []
         
-        analysis = self.processor.get_campaign_analysis(campaign_id)
         if not analysis:
             return story
         
@@ -279,7 +509,7 @@ class ReportGenerator:
         ]
         
         table = Table(summary_data, colWidths=[2.5*inch, 3.5*inch])
-        table.setStyle(self._get_table_style())
+        table.setStyle(self._table_style)
         story.append(table)
         story.append(Spacer(1, 0.2*inch))
         
@@ -291,9 +521,8 @@ class ReportGenerator:
         # Trends
         if analysis['trends'] and analysis['trends'].get('daily'):
             story.append(Paragraph("Performance Trends", styles['CustomHeading2']))
-            chart_path = self._create_campaign_trends_chart(campaign_id, analysis['trends'])
-            if chart_path:
-                img = Image(chart_path, width=6*inch, height=3*inch)
+            if trend_chart:
+                img = _DeferredImage(trend_chart, width=6*inch, height=3*inch)
                 story.append(img)
             story.append(Spacer(1, 0.2*inch))
         
@@ -301,28 +530,15 @@ class ReportGenerator:
         if analysis['channels']['by_channel']:
             story.append(Paragraph("Channel Performance", styles['CustomHeading2']))
             
-            channel_data = [['Channel', 'Impressions', 'Clicks', 'CTR', 'Spend']]
-            for channel in analysis['channels']['by_channel'][:5]:
-                channel_data.append([
-                    channel['channel_name'],
-                    f"{int(channel['impressions']):,}",
-                    f"{int(channel['clicks']):,}",
-                    f"{channel['ctr']:.2f}%",
-                    f"${channel['media_cost_usd']:,.2f}"
-                ])
-            
-            table = Table(channel_data, colWidths=[1.5*inch, 1.5*inch, 1*inch, 1*inch, 1.5*inch])
-            table.setStyle(self._get_table_style())
-            story.append(table)
+            story.append(self._create_channel_table(analysis['channels']['by_channel']))
             story.append(Spacer(1, 0.2*inch))
         
         # Platform breakdown chart
         if analysis['platforms']:
-            chart_path = self._create_platform_breakdown_chart(campaign_id, analysis['platforms'])
-            if chart_path:
+            chart = self._create_platform_breakdown_chart(analysis['platforms'])
+            if chart:
                 story.append(Paragraph("Platform Distribution", styles['CustomHeading2']))
-                img = Image(chart_path, width=5*inch, height=3*inch)
-                story.append(img)
+                story.append(chart)
         
         return story
     
@@ -339,19 +555,7 @@ class ReportGenerator:
         story.append(Paragraph("Top Performing Channels", styles['CustomHeading2']))
         channels = cross_analysis['channel_comparison']
         if channels:
-            channel_data = [['Channel', 'Impressions', 'Clicks', 'CTR', 'Spend']]
-            for channel in channels[:5]:
-                channel_data.append([
-                    channel['channel_name'],
-                    f"{int(channel['impressions']):,}",
-                    f"{int(channel['clicks']):,}",
-                    f"{channel['ctr']:.2f}%",
-                    f"${channel['media_cost_usd']:,.2f}"
-                ])
-            
-            table = Table(channel_data, colWidths=[1.5*inch, 1.5*inch, 1*inch, 1*inch, 1.5*inch])
-            table.setStyle(self._get_table_style())
-            story.append(table)
+            story.append(self._create_channel_table(channels))
         
         story.append(Spacer(1, 0.3*inch))
         
@@ -359,154 +563,114 @@ class ReportGenerator:
         if cross_analysis['top_keywords']:
             story.append(Paragraph("Top Performing Keywords", styles['CustomHeading2']))
             
-            keyword_data = [['Keyword', 'Impressions', 'Clicks', 'CTR']]
-            for keyword in cross_analysis['top_keywords'][:10]:
-                keyword_data.append([
+            keyword_data = [['Keyword', 'Impressions', 'Clicks', 'CTR']] + [
+                [
                     str(keyword['keywords'])[:30],
                     f"{int(keyword['impressions']):,}",
                     f"{int(keyword['clicks']):,}",
                     f"{keyword['ctr']:.2f}%"
-                ])
+                ]
+                for keyword in cross_analysis['top_keywords'][:10]
+            ]
             
             table = Table(keyword_data, colWidths=[2.5*inch, 1.5*inch, 1*inch, 1*inch])
-            table.setStyle(self._get_table_style())
+            table.setStyle(self._table_style)
             story.append(table)
         
         return story
     
+    def _create_channel_table(self, channels):
+        """Create the top-five channel performance table"""
+        channel_data = [['Channel', 'Impressions', 'Clicks', 'CTR', 'Spend']] + [
+            [
+                channel['channel_name'],
+                f"{int(channel['impressions']):,}",
+                f"{int(channel['clicks']):,}",
+                f"{channel['ctr']:.2f}%",
+                f"${channel['media_cost_usd']:,.2f}"
+            ]
+            for channel in channels[:5]
+        ]
+        
+        table = Table(channel_data, colWidths=[1.5*inch, 1.5*inch, 1*inch, 1*inch, 1.5*inch])
+        table.setStyle(self._table_style)
+        return table
+    
     def _create_platform_comparison_chart(self, platform_data):
-        """Create platform comparison chart"""
+        """Create platform comparison bar charts as a vector drawing"""
         if not platform_data:
             return None
         
-        df = pd.DataFrame(platform_data)
-        
-        fig, axes = plt.subplots(1, 2, figsize=(12, 4))
-        
-        # CTR comparison
-        axes[0].bar(df['ext_service_name'], df['ctr'], color=['#3498db', '#e74c3c', '#2ecc71'])
-        axes[0].set_title('CTR by Platform')
-        axes[0].set_ylabel('CTR (%)')
-        axes[0].tick_params(axis='x', rotation=45)
-        
-        # Spend comparison
-        axes[1].bar(df['ext_service_name'], df['media_cost_usd'], color=['#3498db', '#e74c3c', '#2ecc71'])
-        axes[1].set_title('Spend by Platform')
-        axes[1].set_ylabel('Spend ($)')
-        axes[1].tick_params(axis='x', rotation=45)
-        
-        plt.tight_layout()
-        
-        chart_path = os.path.join(self.chart_folder, f'platform_comparison_{datetime.now().timestamp()}.png')
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return chart_path
+        names = [str(platform['ext_service_name']) for platform in platform_data]
+        drawing = Drawing(6*inch, 3.5*inch)
+        
+        # CTR comparison and spend comparison, side by side
+        for i, (column, title, label_format) in enumerate([
+            ('ctr', 'CTR by Platform', '%.2f'),
+            ('media_cost_usd', 'Spend by Platform', lambda value: f"{value:,.0f}")
+        ]):
+            left = 0.5*inch + i * 3*inch
+            chart = self._bar_chart(names, [float(platform[column]) for platform in platform_data], CHART_COLORS[:3])
+            chart.x, chart.y = left, 0.9*inch
+            chart.width, chart.height = 2.2*inch, 2.1*inch
+            chart.valueAxis.labelTextFormat = label_format
+            drawing.add(chart)
+            drawing.add(String(left + 1.1*inch, 3.2*inch, title, fontName='Helvetica-Bold', fontSize=10, textAnchor='middle'))
+        
+        return drawing
     
-    def _create_platform_trends_chart(self, platform_name, trends_data):
-        """Create platform trends chart"""
-        if not trends_data:
-            return None
-        
-        df = pd.DataFrame(trends_data)
-        if len(df) == 0:
-            return None
-        
-        fig, axes = plt.subplots(2, 1, figsize=(10, 6))
-        
-        # CTR trend
-        axes[0].plot(df['date'], df['ctr'], marker='o', color='#3498db', linewidth=2)
-        axes[0].set_title(f'{platform_name} - CTR Trend')
-        axes[0].set_ylabel('CTR (%)')
-        axes[0].tick_params(axis='x', rotation=45)
-        axes[0].grid(True, alpha=0.3)
-        
-        # Spend trend
-        axes[1].plot(df['date'], df['media_cost_usd'], marker='o', color='#e74c3c', linewidth=2)
-        axes[1].set_title(f'{platform_name} - Spend Trend')
-        axes[1].set_ylabel('Spend ($)')
-        axes[1].tick_params(axis='x', rotation=45)
-        axes[1].grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        
-        chart_path = os.path.join(self.chart_folder, f'platform_trends_{platform_name}_{datetime.now().timestamp()}.png')
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return chart_path
+    def _bar_chart(self, names, values, palette):
+        """Single-series vertical bar chart, one colour per bar (cycling through palette)"""
+        chart = VerticalBarChart()
+        chart.data = [values]
+        chart.categoryAxis.categoryNames = names
+        chart.categoryAxis.labels.angle = 45
+        chart.categoryAxis.labels.boxAnchor = 'ne'
+        chart.categoryAxis.labels.fontName = 'Helvetica'
+        chart.categoryAxis.labels.fontSize = 8
+        chart.valueAxis.valueMin = 0
+        chart.valueAxis.rangeRound = 'ceiling'
+        chart.valueAxis.labels.fontName = 'Helvetica'
+        chart.valueAxis.labels.fontSize = 8
+        chart.valueAxis.visibleGrid = True
+        chart.valueAxis.gridStrokeColor = colors.lightgrey
+        chart.bars.strokeColor = None
+        for j in range(len(values)):
+            chart.bars[(0, j)].fillColor = palette[j % len(palette)]
+        return chart
     
-    def _create_campaign_trends_chart(self, campaign_id, trends):
-        """Create campaign trends chart"""
-        if not trends.get('daily'):
+    def _create_platform_breakdown_chart(self, platforms):
+        """Create platform spend breakdown pie chart as a vector drawing"""
+        shares = [float(platform['spend_percentage']) for platform in platforms]
+        if not platforms or sum(shares) <= 0:
             return None
         
-        df = pd.DataFrame(trends['daily'])
-        if len(df) == 0:
-            return None
-        
-        fig, axes = plt.subplots(2, 2, figsize=(12, 8))
-        
-        # CTR trend
-        axes[0, 0].plot(df['date'], df['ctr'], marker='o', color='#3498db', linewidth=2)
-        axes[0, 0].set_title('Daily CTR')
-        axes[0, 0].set_ylabel('CTR (%)')
-        axes[0, 0].tick_params(axis='x', rotation=45)
-        axes[0, 0].grid(True, alpha=0.3)
-        
-        # Spend trend
-        axes[0, 1].plot(df['date'], df['media_cost_usd'], marker='o', color='#e74c3c', linewidth=2)
-        axes[0, 1].set_title('Daily Spend')
-        axes[0, 1].set_ylabel('Spend ($)')
-        axes[0, 1].tick_params(axis='x', rotation=45)
-        axes[0, 1].grid(True, alpha=0.3)
-        
-        # Impressions trend
-        axes[1, 0].plot(df['date'], df['impressions'], marker='o', color='#2ecc71', linewidth=2)
-        axes[1, 0].set_title('Daily Impressions')
-        axes[1, 0].set_ylabel('Impressions')
-        axes[1, 0].tick_params(axis='x', rotation=45)
-        axes[1, 0].grid(True, alpha=0.3)
-        
-        # Clicks trend
-        axes[1, 1].plot(df['date'], df['clicks'], marker='o', color='#f39c12', linewidth=2)
-        axes[1, 1].set_title('Daily Clicks')
-        axes[1, 1].set_ylabel('Clicks')
-        axes[1, 1].tick_params(axis='x', rotation=45)
-        axes[1, 1].grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        
-        chart_path = os.path.join(self.chart_folder, f'campaign_trends_{campaign_id}_{datetime.now().timestamp()}.png')
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return chart_path
-    
-    def _create_platform_breakdown_chart(self, campaign_id, platforms):
-        """Create platform breakdown pie chart"""
-        if not platforms:
-            return None
-        
-        df = pd.DataFrame(platforms)
-        
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        colors_list = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6']
-        ax.pie(df['spend_percentage'], labels=df['ext_service_name'], autopct='%1.1f%%',
-               colors=colors_list[:len(df)], startangle=90)
-        ax.set_title('Spend Distribution by Platform')
-        
-        chart_path = os.path.join(self.chart_folder, f'platform_breakdown_{campaign_id}_{datetime.now().timestamp()}.png')
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return chart_path
+        drawing = Drawing(5*inch, 3*inch)
+        drawing.add(String(2.5*inch, 2.8*inch, 'Spend Distribution by Platform',
+                           fontName='Helvetica-Bold', fontSize=10, textAnchor='middle'))
+        
+        pie = Pie()
+        pie.x, pie.y = 1.5*inch, 0.35*inch
+        pie.width = pie.height = 2*inch
+        pie.data = shares
+        total = sum(shares)
+        pie.labels = [f"{platform['ext_service_name']} {share / total * 100:.1f}%" for platform, share in zip(platforms, shares)]
+        pie.startAngle = 90
+        pie.direction = 'anticlockwise'
+        pie.sideLabels = True
+        pie.slices.strokeColor = colors.white
+        pie.slices.fontName = 'Helvetica'
+        pie.slices.fontSize = 8
+        for i in range(len(shares)):
+            pie.slices[i].fillColor = CHART_COLORS[i % len(CHART_COLORS)]
+        drawing.add(pie)
+        
+        return drawing
     
     def _get_table_style(self):
         """Get standard table style"""
         return TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+            ('BACKGROUND', (0, 0), (-1, 0), COLOR_TABLE_HEADER),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
@@ -519,27 +683,40 @@ class ReportGenerator:
             ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
         ])
     
+    def _get_cover_table_style(self):
+        """Get cover page summary table style"""
+        return TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+        ])
+    
     def _generate_executive_insight(self, cross_analysis):
         """Generate executive-level insight using AI"""
-        insight = self.ai_generator.generate_executive_summary(cross_analysis)
+        insight = self._insights.get('executive_summary')
+        if insight is None:
+            insight = self.ai_generator.generate_executive_summary(cross_analysis)
+        return insight
+    
+    def _generate_recommendations_insight(self, cross_analysis):
+        """Generate account-level recommendations using AI"""
+        insight = self._insights.get('recommendations')
+        if insight is None:
+            insight = self.ai_generator.generate_recommendations(cross_analysis)
         return insight
     
     def _generate_platform_insight(self, platform_name, platform_data):
         """Generate platform-specific insight using AI"""
-        insight = self.ai_generator.generate_platform_insight(platform_name, platform_data)
+        insight = self._insights.get('platforms', {}).get(platform_name)
+        if insight is None:
+            insight = self.ai_generator.generate_platform_insight(platform_name, platform_data)
         return insight
     
     def _generate_campaign_insight(self, campaign_id, analysis):
         """Generate campaign-specific insight using AI"""
-        insight = self.ai_generator.generate_campaign_insight(campaign_id, analysis)
-        return insight
-    
-    def _cleanup_charts(self):
-        """Clean up generated chart files"""
-        for file in os.listdir(self.chart_folder):
-            file_path = os.path.join(self.chart_folder, file)
-            try:
-                if os.path.isfile(file_path):
-                    os.unlink(file_path)
-            except Exception as e:
-                print(f"Error deleting {file_path}: {e}")
\ No newline at end of file
+        insight = self._insights.get('campaigns', {}).get(campaign_id)
+        if insight is None:
+            insight = self.ai_generator.generate_campaign_insight(campaign_id, analysis)
+        return insight
\ No newline at end of file
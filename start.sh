@@ -50,6 +50,13 @@ echo ""
 echo "After the server starts, open frontend/index.html in your browser"
 echo ""
 
-# Start Flask app
-cd backend
-python app.py
\ No newline at end of file
+# Build PDF reports in a background worker when Redis is running;
+# without it the API generates reports inside the request
+if command -v redis-cli &> /dev/null && redis-cli ping &> /dev/null; then
+    echo "✓ Redis found, starting report worker"
+    rq worker reports &
+fi
+
+# Start the API under gunicorn with gevent workers so slow Gemini calls
+# in one request don't block the others
+gunicorn -c gunicorn.conf.py -k gevent -w 4 --worker-connections 100 -b 0.0.0.0:5000 --timeout 300 app:app
\ No newline at end of file